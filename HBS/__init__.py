@@ -1,5 +1,5 @@
 from __future__ import annotations
 
-from .hbs_api import run_hbs_social
+from .hbs_api import run_hbs_social, run_hbs_social_rows
 
-__all__ = ["run_hbs_social"]
+__all__ = ["run_hbs_social", "run_hbs_social_rows"]
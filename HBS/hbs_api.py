@@ -1,49 +1,60 @@
 from __future__ import annotations
 
-from pathlib import Path
+from functools import lru_cache
+from typing import Iterable, Sequence
 
 from .hbs_config import _RunConfig
-from .hbs_domain import RunResult
+from .hbs_domain import (
+    ExtendedMetrics,
+    IndividualPref,
+    IndividualPrefColumns,
+    PairPref,
+    PairPrefColumns,
+    PostAllocLog,
+    RunResult,
+    RunSummary,
+)
 from .hbs_engine import _HbsSocialDraftEngine
-from .hbs_io import _read_table_1, _read_table_2, _read_table_lambda
+from .hbs_io import StrPath, _read_table_1, _read_table_2, _read_table_lambda
 
+_VALID_IMPROVE_MODES = frozenset(("swap", "add-drop"))
 
-def run_hbs_social(
-    csv_a: Path,
-    csv_b: Path,
+
+@lru_cache(maxsize=128, typed=True)
+def _build_config(
     *,
-    csv_lambda: Path | None = None,
     cap_default: int,
     b: int,
     seed: int,
-    draft_rounds: int | None = None,
-    post_iters: int = 0,
-    improve_mode: str = "swap",
-    progress: bool = False,
-    sanity_checks: bool = False,
-    delta_check_every: int = 0,
-) -> RunResult:
+    draft_rounds: int | None,
+    post_iters: int,
+    improve_mode: str,
+    progress: bool,
+    sanity_checks: bool,
+    delta_check_every: int,
+    swap_top_k: int | None = None,
+) -> _RunConfig:
     """
-    Public API function: run a single allocation using the social snake draft.
+    Validate run parameters and resolve defaults into a run config.
 
-    This is a thin orchestration layer:
-      - Validates parameters
-      - Loads CSV inputs
-      - Builds and runs the draft engine
-
-    Keeping a stable, simple function interface is useful for notebooks/tests
-    and avoids coupling callers to CLI details.
+    All arguments are hashable and `_RunConfig` is frozen, so validated configs are memoized:
+    repeated calls with the same parameters (sweeps, notebooks) skip re-validation. The cache is
+    typed, so e.g. `cap_default=2` and `cap_default=2.0` get separate configs. Invalid parameters
+    raise every time because exceptions are not cached.
     """
+
     if cap_default <= 0:
         raise ValueError("cap_default must be > 0")
     if b <= 0:
         raise ValueError("b must be > 0")
     if post_iters < 0:
         raise ValueError("post_iters must be >= 0")
-    if improve_mode not in {"swap", "add-drop"}:
+    if improve_mode not in _VALID_IMPROVE_MODES:
         raise ValueError("improve_mode must be one of: swap, add-drop")
     if delta_check_every < 0:
         raise ValueError("delta_check_every must be >= 0")
+    if swap_top_k is not None and swap_top_k <= 0:
+        raise ValueError("swap_top_k must be > 0")
     if draft_rounds is None:
         draft_rounds = b
     if draft_rounds < 0:
@@ -51,32 +62,54 @@ def run_hbs_social(
     if draft_rounds > b:
         raise ValueError("draft_rounds must be <= b")
 
-    rows_a = _read_table_1(csv_a)
-    rows_b = _read_table_2(csv_b)
-    student_lambdas: dict[str, float] | None = None
-    if csv_lambda is not None:
-        lambda_rows = _read_table_lambda(csv_lambda)
-        student_lambdas = {}
-        for row in lambda_rows:
-            if not (0.0 <= row.lambda_friend <= 1.0):
-                raise ValueError(
-                    f"LambdaFriend must be in [0,1], got {row.lambda_friend} for {row.student_id}"
-                )
-            student_lambdas[row.student_id] = row.lambda_friend
-
-    total_iters = draft_rounds + post_iters
-    config = _RunConfig(
+    return _RunConfig(
         default_capacity=cap_default,
         max_courses=b,
         draft_rounds=draft_rounds,
         post_iters=post_iters,
-        total_iters=total_iters,
+        total_iters=draft_rounds + post_iters,
         improve_mode=improve_mode,
         progress=progress,
         seed=seed,
         sanity_checks=sanity_checks,
         delta_check_every=delta_check_every,
+        swap_top_k=swap_top_k,
     )
+
+
+def _is_empty_run(config: _RunConfig) -> bool:
+    return config.draft_rounds == 0 and config.post_iters == 0
+
+
+def _empty_result() -> RunResult:
+    return RunResult(
+        alloc={},
+        pick_log=[],
+        post_log=PostAllocLog(),
+        summary=RunSummary(
+            total_utility=0.0,
+            gini_total_norm=0.0,
+            gini_base_norm=0.0,
+            total_utility_max=0.0,
+            gini_total_norm_max=1.0,
+            gini_base_norm_max=1.0,
+        ),
+        metrics_extended=ExtendedMetrics(values={}, maxima={}),
+    )
+
+
+def _validate_lambdas(items: Iterable[tuple[str, float]]) -> None:
+    bad = next(((sid, value) for sid, value in items if not (0.0 <= value <= 1.0)), None)
+    if bad is not None:
+        raise ValueError(f"LambdaFriend must be in [0,1], got {bad[1]} for {bad[0]}")
+
+
+def _run_core(
+    rows_a: IndividualPrefColumns | Sequence[IndividualPref],
+    rows_b: PairPrefColumns | Sequence[PairPref],
+    student_lambdas: dict[str, float] | None,
+    config: _RunConfig,
+) -> RunResult:
     engine = _HbsSocialDraftEngine(
         individual_prefs=rows_a,
         pair_prefs=rows_b,
@@ -84,3 +117,113 @@ def run_hbs_social(
         config=config,
     )
     return engine.run()
+
+
+def run_hbs_social(
+    csv_a: StrPath,
+    csv_b: StrPath,
+    *,
+    csv_lambda: StrPath | None = None,
+    cap_default: int,
+    b: int,
+    seed: int,
+    draft_rounds: int | None = None,
+    post_iters: int = 0,
+    improve_mode: str = "swap",
+    progress: bool = False,
+    sanity_checks: bool = False,
+    delta_check_every: int = 0,
+    swap_top_k: int | None = None,
+    skip_empty: bool = False,
+) -> RunResult:
+    """
+    Public API function: run a single allocation using the social snake draft.
+
+    This is a thin orchestration layer:
+      - Validates parameters
+      - Loads CSV inputs
+      - Builds and runs the draft engine
+
+    Keeping a stable, simple function interface is useful for notebooks/tests
+    and avoids coupling callers to CLI details.
+
+    With `swap_top_k=K`, the swap phase only offers each course to the K students with the
+    highest potential utility for it instead of searching all pairs (faster on large inputs,
+    but may miss the best swap). The default `None` keeps the exhaustive search.
+
+    Each call parses the CSVs afresh. Sweeps that rerun the same inputs with different
+    parameters should load the tables once (`_read_table_1`/`_read_table_2`) and call
+    `run_hbs_social_rows` instead.
+
+    With `skip_empty=True`, a run with no draft rounds and no post iterations returns an
+    empty result right after parameter validation, without reading the CSVs (useful for
+    dry runs that only probe parameter validity).
+    """
+    config = _build_config(
+        cap_default=cap_default,
+        b=b,
+        seed=seed,
+        draft_rounds=draft_rounds,
+        post_iters=post_iters,
+        improve_mode=improve_mode,
+        progress=progress,
+        sanity_checks=sanity_checks,
+        delta_check_every=delta_check_every,
+        swap_top_k=swap_top_k,
+    )
+    if skip_empty and _is_empty_run(config):
+        return _empty_result()
+
+    rows_a = _read_table_1(csv_a)
+    rows_b = _read_table_2(csv_b)
+    lambda_rows = _read_table_lambda(csv_lambda) if csv_lambda is not None else None
+
+    student_lambdas: dict[str, float] | None = None
+    if lambda_rows is not None:
+        _validate_lambdas((row.student_id, row.lambda_friend) for row in lambda_rows)
+        student_lambdas = {row.student_id: row.lambda_friend for row in lambda_rows}
+
+    return _run_core(rows_a, rows_b, student_lambdas, config)
+
+
+def run_hbs_social_rows(
+    rows_a: IndividualPrefColumns | Sequence[IndividualPref],
+    rows_b: PairPrefColumns | Sequence[PairPref],
+    *,
+    student_lambdas: dict[str, float] | None = None,
+    cap_default: int,
+    b: int,
+    seed: int,
+    draft_rounds: int | None = None,
+    post_iters: int = 0,
+    improve_mode: str = "swap",
+    progress: bool = False,
+    sanity_checks: bool = False,
+    delta_check_every: int = 0,
+    swap_top_k: int | None = None,
+    skip_empty: bool = False,
+) -> RunResult:
+    """
+    Same as `run_hbs_social`, but for already-loaded Tables 1/2 and lambdas (no file I/O).
+
+    Useful in notebooks and sweeps that load the inputs once and rerun with different
+    parameters. The input tables are only read, so they can be shared across runs.
+    """
+    config = _build_config(
+        cap_default=cap_default,
+        b=b,
+        seed=seed,
+        draft_rounds=draft_rounds,
+        post_iters=post_iters,
+        improve_mode=improve_mode,
+        progress=progress,
+        sanity_checks=sanity_checks,
+        delta_check_every=delta_check_every,
+        swap_top_k=swap_top_k,
+    )
+    if skip_empty and _is_empty_run(config):
+        return _empty_result()
+    if student_lambdas is not None:
+        _validate_lambdas(student_lambdas.items())
+
+    return _run_core(rows_a, rows_b, student_lambdas, config)
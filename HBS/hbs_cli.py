@@ -2,9 +2,12 @@ from __future__ import annotations
 
 import argparse
 import logging
+from functools import lru_cache
 from pathlib import Path
+from typing import Sequence
 
 from .hbs_api import run_hbs_social
+from .hbs_domain import RunResult
 from .hbs_io import (
     _write_allocation_csv,
     _write_metrics_extended_csv,
@@ -14,8 +17,19 @@ from .hbs_io import (
 
 LOG = logging.getLogger(__name__)
 
+_LOG_LEVELS = {
+    "CRITICAL": logging.CRITICAL,
+    "ERROR": logging.ERROR,
+    "WARNING": logging.WARNING,
+    "INFO": logging.INFO,
+    "DEBUG": logging.DEBUG,
+}
+
+
+@lru_cache(maxsize=1)
+def _get_parser() -> argparse.ArgumentParser:
+    """Build the CLI parser once per process (reused across in-process invocations)."""
 
-def _parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(
         description="HBS Snake Draft + social (reactive) utilities",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
@@ -50,6 +64,12 @@ def _parse_args() -> argparse.Namespace:
         default="swap",
         help="Режим улучшений после драфта: swap (обмены) или add-drop (HBS-style)",
     )
+    p.add_argument(
+        "--swap-top-k",
+        type=int,
+        default=None,
+        help="Swap-фаза: предлагать курс только K лучшим кандидатам (по умолчанию полный перебор)",
+    )
     p.add_argument("--seed", type=int, default=42)
     p.add_argument(
         "--progress",
@@ -89,16 +109,24 @@ def _parse_args() -> argparse.Namespace:
     p.add_argument(
         "--log-level",
         default="WARNING",
-        choices=["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"],
+        choices=list(_LOG_LEVELS),
         help="Logging verbosity",
     )
-    return p.parse_args()
+    return p
 
 
-def main() -> int:
-    args = _parse_args()
+def _parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    return _get_parser().parse_args(argv)
+
+
+def run_from_args(args: argparse.Namespace) -> RunResult:
+    """
+    Run the allocator and write all output CSVs for already-parsed CLI arguments.
+
+    Useful for parameter sweeps that drive the CLI in-process, e.g.
+    `run_from_args(argparse.Namespace(**{**vars(args), "seed": seed}))`.
+    """
 
-    logging.basicConfig(level=getattr(logging, args.log_level))
     LOG.debug("Starting run with args=%s", args)
 
     result = run_hbs_social(
@@ -114,6 +142,7 @@ def main() -> int:
         progress=args.progress,
         sanity_checks=args.sanity_checks,
         delta_check_every=args.delta_check_every,
+        swap_top_k=args.swap_top_k,
     )
 
     _write_allocation_csv(
@@ -137,6 +166,20 @@ def main() -> int:
         args.out_metrics_extended,
         metrics=result.metrics_extended,
     )
+    return result
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = _parse_args(argv)
+
+    level = _LOG_LEVELS[args.log_level]
+    root = logging.getLogger()
+    if root.handlers:
+        # Already configured (repeated in-process calls): only adjust the level.
+        root.setLevel(level)
+    else:
+        logging.basicConfig(level=level)
+    result = run_from_args(args)
 
     print(f"OK: {args.out_allocation} ({len(result.pick_log)} picks)")
     print(
@@ -3,7 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class _RunConfig:
     """
     User-controlled parameters that define the draft and its objective.
@@ -19,3 +19,4 @@ class _RunConfig:
     seed: int
     sanity_checks: bool
     delta_check_every: int
+    swap_top_k: int | None = None
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import math
+from array import array
+from dataclasses import dataclass, field
+from typing import ClassVar, Iterable, Iterator
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class IndividualPref:
     """A single student's preference for a course (Table 1: individual preferences)."""
 
@@ -13,7 +16,7 @@ class IndividualPref:
     position: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PairPref:
     """A student's top-k friend choice for a specific course (Table 2)."""
 
@@ -24,7 +27,64 @@ class PairPref:
     score: int | None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
+class IndividualPrefColumns:
+    """
+    Table 1 in column-major (struct-of-arrays) form.
+
+    Row i is (student_ids[i], course_ids[i], scores[i], positions[i]). Integer columns are
+    packed `array`s so the engine can index and zip them without touching per-row objects.
+    """
+
+    student_ids: tuple[str, ...]
+    course_ids: tuple[str, ...]
+    scores: array
+    positions: array
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[IndividualPref]) -> IndividualPrefColumns:
+        rows = tuple(rows)
+        return cls(
+            student_ids=tuple(r.student_id for r in rows),
+            course_ids=tuple(r.course_id for r in rows),
+            scores=array("q", (r.score for r in rows)),
+            positions=array("q", (r.position for r in rows)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.student_ids)
+
+
+@dataclass(frozen=True, slots=True)
+class PairPrefColumns:
+    """
+    Table 2 in column-major (struct-of-arrays) form.
+
+    `scores` stays a tuple because the Score column is optional (None when missing).
+    """
+
+    student_ids_a: tuple[str, ...]
+    student_ids_b: tuple[str, ...]
+    course_ids: tuple[str, ...]
+    positions: array
+    scores: tuple[int | None, ...]
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[PairPref]) -> PairPrefColumns:
+        rows = tuple(rows)
+        return cls(
+            student_ids_a=tuple(r.student_id_a for r in rows),
+            student_ids_b=tuple(r.student_id_b for r in rows),
+            course_ids=tuple(r.course_id for r in rows),
+            positions=array("q", (r.position for r in rows)),
+            scores=tuple(r.score for r in rows),
+        )
+
+    def __len__(self) -> int:
+        return len(self.student_ids_a)
+
+
+@dataclass(frozen=True, slots=True)
 class StudentLambda:
     """Per-student weight for the friend bonus (0..1)."""
 
@@ -32,7 +92,7 @@ class StudentLambda:
     lambda_friend: float
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class PickLogRow:
     """Audit row capturing what was chosen and why (utility decomposition at pick time)."""
 
@@ -44,23 +104,92 @@ class PickLogRow:
     friend_bonus_at_pick: float
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RunSummary:
     """Aggregated metrics for a single run (used for analysis/experiments)."""
 
+    RECORD_FIELDS: ClassVar[tuple[str, ...]] = (
+        "total_utility",
+        "gini_total_norm",
+        "gini_base_norm",
+        "total_utility_max",
+        "gini_total_norm_max",
+        "gini_base_norm_max",
+    )
+
     total_utility: float
     gini_total_norm: float
     gini_base_norm: float
+    total_utility_max: float
+    gini_total_norm_max: float
+    gini_base_norm_max: float
+
+    @property
+    def record(self) -> array:
+        """Packed float64 record in `RECORD_FIELDS` order (cheap to stack across many runs)."""
 
+        return array(
+            "d",
+            (
+                self.total_utility,
+                self.gini_total_norm,
+                self.gini_base_norm,
+                self.total_utility_max,
+                self.gini_total_norm_max,
+                self.gini_base_norm_max,
+            ),
+        )
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class ExtendedMetrics:
     """Additional metrics for deeper analysis (exported to metrics_extended CSV)."""
 
+    RECORD_FIELDS: ClassVar[tuple[str, ...]] = (
+        "total_utility",
+        "total_base_utility",
+        "total_friend_utility",
+        "avg_utility_per_student",
+        "avg_courses_per_student",
+        "students_full_alloc_rate",
+        "unfilled_seats_total",
+        "course_fill_rate_mean",
+        "avg_position",
+        "median_position",
+        "share_top1",
+        "share_top3",
+        "avg_friend_overlaps_per_student",
+        "share_students_with_any_friend_overlap",
+        "gini_total_norm",
+        "gini_base_norm",
+        "jain_index",
+        "theil_index",
+        "atkinson_index_e0_5",
+        "utility_min",
+        "utility_p10",
+        "utility_p25",
+        "utility_p50",
+        "utility_p75",
+        "utility_p90",
+    )
+
     values: dict[str, float]
+    maxima: dict[str, float]
+
+    @property
+    def record(self) -> array:
+        """
+        Packed float64 record of `values` in `RECORD_FIELDS` order.
+
+        Metrics missing from `values` (e.g. the empty result of a skipped run) are NaN, so
+        records from different runs always stack column-aligned.
+        """
+
+        values = self.values
+        return array("d", (values.get(name, math.nan) for name in self.RECORD_FIELDS))
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, eq=False)
 class PostAllocLogRow:
     """
     One post-allocation iteration/event (swap or add/drop).
@@ -80,7 +209,101 @@ class PostAllocLogRow:
     delta_utility: float | None
 
 
-@dataclass(frozen=True)
+@dataclass(slots=True)
+class PostAllocLog:
+    """
+    Column-major buffer of post-allocation events (one entry per event or no-op iteration).
+
+    The engine appends to parallel columns instead of building a PostAllocLogRow per event;
+    iterating the log materializes rows on demand.
+    """
+
+    iterations: array = field(default_factory=lambda: array("q"))
+    event_types: list[str] = field(default_factory=list)
+    student_ids: list[str | None] = field(default_factory=list)
+    dropped_courses: list[tuple[str, ...] | None] = field(default_factory=list)
+    added_courses: list[tuple[str, ...] | None] = field(default_factory=list)
+    swap_students_1: list[str | None] = field(default_factory=list)
+    swap_courses_1: list[str | None] = field(default_factory=list)
+    swap_students_2: list[str | None] = field(default_factory=list)
+    swap_courses_2: list[str | None] = field(default_factory=list)
+    delta_utilities: list[float | None] = field(default_factory=list)
+
+    def _append(
+        self,
+        iteration: int,
+        event_type: str,
+        student_id: str | None = None,
+        dropped_courses: tuple[str, ...] | None = None,
+        added_courses: tuple[str, ...] | None = None,
+        swap_student_1: str | None = None,
+        swap_course_1: str | None = None,
+        swap_student_2: str | None = None,
+        swap_course_2: str | None = None,
+        delta_utility: float | None = None,
+    ) -> None:
+        self.iterations.append(iteration)
+        self.event_types.append(event_type)
+        self.student_ids.append(student_id)
+        self.dropped_courses.append(dropped_courses)
+        self.added_courses.append(added_courses)
+        self.swap_students_1.append(swap_student_1)
+        self.swap_courses_1.append(swap_course_1)
+        self.swap_students_2.append(swap_student_2)
+        self.swap_courses_2.append(swap_course_2)
+        self.delta_utilities.append(delta_utility)
+
+    def append_swap(
+        self, iteration: int, s1: str, c1: str, s2: str, c2: str, delta_utility: float
+    ) -> None:
+        self._append(
+            iteration,
+            "SWAP",
+            swap_student_1=s1,
+            swap_course_1=c1,
+            swap_student_2=s2,
+            swap_course_2=c2,
+            delta_utility=delta_utility,
+        )
+
+    def append_add_drop(
+        self,
+        iteration: int,
+        student_id: str,
+        dropped_courses: tuple[str, ...],
+        added_courses: tuple[str, ...],
+    ) -> None:
+        self._append(
+            iteration,
+            "ADD_DROP",
+            student_id=student_id,
+            dropped_courses=dropped_courses,
+            added_courses=added_courses,
+        )
+
+    def append_noop(self, iteration: int) -> None:
+        self._append(iteration, "")
+
+    def __len__(self) -> int:
+        return len(self.iterations)
+
+    def __iter__(self) -> Iterator[PostAllocLogRow]:
+        for values in zip(
+            self.iterations,
+            self.event_types,
+            self.student_ids,
+            self.dropped_courses,
+            self.added_courses,
+            self.swap_students_1,
+            self.swap_courses_1,
+            self.swap_students_2,
+            self.swap_courses_2,
+            self.delta_utilities,
+        ):
+            yield PostAllocLogRow(*values)
+
+
+@dataclass(frozen=True, slots=True)
 class RunResult:
     """
     Outputs of a run.
@@ -91,6 +314,6 @@ class RunResult:
 
     alloc: dict[str, list[str]]
     pick_log: list[PickLogRow]
-    post_log: list[PostAllocLogRow]
+    post_log: PostAllocLog
     summary: RunSummary
     metrics_extended: ExtendedMetrics
@@ -2,14 +2,21 @@ from __future__ import annotations
 
 import math
 import random
+from collections import Counter
+from bisect import insort
+from heapq import nlargest, nsmallest
+from itertools import repeat
+from typing import Sequence
 
 from .hbs_config import _RunConfig
 from .hbs_domain import (
     ExtendedMetrics,
     IndividualPref,
+    IndividualPrefColumns,
     PairPref,
+    PairPrefColumns,
     PickLogRow,
-    PostAllocLogRow,
+    PostAllocLog,
     RunResult,
     RunSummary,
 )
@@ -72,23 +79,29 @@ class _HbsSocialDraftEngine:
     def __init__(
         self,
         *,
-        individual_prefs: list[IndividualPref],
-        pair_prefs: list[PairPref],
+        individual_prefs: IndividualPrefColumns | Sequence[IndividualPref],
+        pair_prefs: PairPrefColumns | Sequence[PairPref],
         student_lambdas: dict[str, float] | None,
         config: _RunConfig,
     ) -> None:
         self._config = config
 
+        # The engine works on columnar tables; row lists (tests, notebooks) are converted once.
+        if not isinstance(individual_prefs, IndividualPrefColumns):
+            individual_prefs = IndividualPrefColumns.from_rows(individual_prefs)
+        if not isinstance(pair_prefs, PairPrefColumns):
+            pair_prefs = PairPrefColumns.from_rows(pair_prefs)
+        indiv_keys = list(zip(individual_prefs.student_ids, individual_prefs.course_ids))
+        pair_keys = list(
+            zip(pair_prefs.student_ids_a, pair_prefs.student_ids_b, pair_prefs.course_ids)
+        )
+
         # Build the student/course universes from both tables to avoid dropping IDs.
-        students: set[str] = set()
-        courses: set[str] = set()
-        for r in individual_prefs:
-            students.add(r.student_id)
-            courses.add(r.course_id)
-        for r in pair_prefs:
-            students.add(r.student_id_a)
-            students.add(r.student_id_b)
-            courses.add(r.course_id)
+        students: set[str] = set(individual_prefs.student_ids)
+        students.update(pair_prefs.student_ids_a)
+        students.update(pair_prefs.student_ids_b)
+        courses: set[str] = set(individual_prefs.course_ids)
+        courses.update(pair_prefs.course_ids)
 
         if not students:
             raise ValueError("Students not found (CSV A/B empty?)")
@@ -99,11 +112,15 @@ class _HbsSocialDraftEngine:
         self._courses = sorted(courses)
         self._k_courses = len(self._courses)
 
-        self._lambda_by_student = {s: self._DEFAULT_LAMBDA for s in self._students}
+        # Dense per-student lambda: every student in the universe has an entry, so lookups
+        # index it directly instead of falling back to the default on every access.
+        self._lambda_by_student: dict[str, float] = dict.fromkeys(self._students, self._DEFAULT_LAMBDA)
         if student_lambdas:
-            for student_id, value in student_lambdas.items():
-                if student_id in self._lambda_by_student:
-                    self._lambda_by_student[student_id] = value
+            self._lambda_by_student.update(
+                (student_id, value)
+                for student_id, value in student_lambdas.items()
+                if student_id in self._lambda_by_student
+            )
 
         self._rng = random.Random(config.seed)
 
@@ -112,53 +129,128 @@ class _HbsSocialDraftEngine:
         # - set: fast membership checks during drafting
         self._alloc_list: dict[str, list[str]] = {s: [] for s in self._students}
         self._alloc_set: dict[str, set[str]] = {s: set() for s in self._students}
+        # - sorted list: canonical course order for welfare sums and swap enumeration,
+        #   kept in step with the set so it is never re-sorted from scratch
+        self._alloc_sorted: dict[str, list[str]] = {s: [] for s in self._students}
+        # Seats left per course, keyed by course id like every other per-course table (str hashes
+        # are cached, so an index array would only add an id -> index lookup in front).
         self._capacity_left: dict[str, int] = {c: config.default_capacity for c in self._courses}
 
-        # Index individual preferences for O(1) lookup.
-        self._indiv_by_key: dict[tuple[str, str], IndividualPref] = {
-            (r.student_id, r.course_id): r for r in individual_prefs
+        # Index individual preferences per student, then per course: lookups bind the student's
+        # row once and then key by course, with no (student, course) tuple built per lookup.
+        self._position_by_student: dict[str, dict[str, int]] = {s: {} for s in self._students}
+        self._score_by_student: dict[str, dict[str, int]] = {s: {} for s in self._students}
+        for (student_id, course_id), position, score in zip(
+            indiv_keys, individual_prefs.positions, individual_prefs.scores
+        ):
+            self._position_by_student[student_id][course_id] = position
+            self._score_by_student[student_id][course_id] = score
+        # Positions take few distinct values, so each utility is computed once per distinct
+        # position and then looked up while filling the per-student rows.
+        base_u_by_position = {p: _pos_u(p, self._k_courses) for p in set(individual_prefs.positions)}
+        self._base_u_by_student: dict[str, dict[str, float]] = {
+            s: {c: base_u_by_position[position] for c, position in positions.items()}
+            for s, positions in self._position_by_student.items()
         }
-        self._base_u_by_key: dict[tuple[str, str], float] = {
-            (r.student_id, r.course_id): _pos_u(r.position, self._k_courses) for r in individual_prefs
-        }
-
-        # Index pair preferences for O(1) lookup and build the directed friend graph.
-        self._pair_by_key: dict[tuple[str, str, str], PairPref] = {}
-        self._friends: dict[str, set[str]] = {}
-        for r in pair_prefs:
-            self._pair_by_key[(r.student_id_a, r.student_id_b, r.course_id)] = r
-            self._friends.setdefault(r.student_id_a, set()).add(r.student_id_b)
 
-        # Reverse graph for deterministic and efficient "who depends on this friend's allocation" queries.
-        self._followers: dict[str, set[str]] = {s: set() for s in self._students}
-        for student_id_a, friends in self._friends.items():
-            for friend_id in friends:
-                self._followers.setdefault(friend_id, set()).add(student_id_a)
+        # Static part of every draft candidate, per student in course order:
+        # (course_id, Base, -PositionA, ScoreA). A pick only adds the reactive friend bonus.
+        self._pick_rows: dict[str, tuple[tuple[str, float, int, int], ...]] = {}
+        for s in self._students:
+            base_s = self._base_u_by_student[s]
+            position_s = self._position_by_student[s]
+            score_s = self._score_by_student[s]
+            self._pick_rows[s] = tuple(
+                (
+                    c,
+                    base_s.get(c, 0.0),
+                    -position_s.get(c, self._MISSING_POSITION),
+                    score_s.get(c, self._MISSING_SCORE),
+                )
+                for c in self._courses
+            )
 
         # Table 2 contains only a friend rank Position (top-k). We use a linear mapping without
         # zero so that rank K is still better than missing.
-        self._k_friend_rank = max(1, max((r.position for r in pair_prefs), default=3))
-        self._pair_u_by_key: dict[tuple[str, str, str], float] = {
-            (r.student_id_a, r.student_id_b, r.course_id): _pos_u_friend(
-                r.position, self._k_friend_rank
-            )
-            for r in pair_prefs
+        self._k_friend_rank = max(1, max(pair_prefs.positions, default=3))
+
+        # Index pair preferences per directed edge: A -> B -> {course: PairU}. The keys of A's
+        # row are A's friends (the directed friend graph); no (A, B, course) tuples are kept.
+        pair_u_by_position = {
+            p: _pos_u_friend(p, self._k_friend_rank) for p in set(pair_prefs.positions)
         }
+        self._pair_u_by_student: dict[str, dict[str, dict[str, float]]] = {}
+        for (student_id_a, student_id_b, course_id), position in zip(pair_keys, pair_prefs.positions):
+            edges = self._pair_u_by_student.setdefault(student_id_a, {})
+            edges.setdefault(student_id_b, {})[course_id] = pair_u_by_position[position]
+
+        # Reverse graph for deterministic and efficient "who depends on this friend's allocation" queries.
+        followers: dict[str, set[str]] = {}
+        for student_id_a, edges in self._pair_u_by_student.items():
+            for friend_id in edges:
+                followers.setdefault(friend_id, set()).add(student_id_a)
 
         # Precompute sorted adjacency for deterministic iteration and faster deltas.
         self._friends_list: dict[str, tuple[str, ...]] = {
-            s: tuple(sorted(self._friends.get(s, set()))) for s in self._students
+            s: tuple(sorted(self._pair_u_by_student.get(s, ()))) for s in self._students
         }
         self._followers_list: dict[str, tuple[str, ...]] = {
-            s: tuple(sorted(self._followers.get(s, set()))) for s in self._students
+            s: tuple(sorted(followers.get(s, ()))) for s in self._students
+        }
+
+        # The same adjacency with each edge's Table 2 weights attached, as (other_id, {course: PairU})
+        # in sorted id order. Overlap loops read the weight from the edge row directly.
+        self._friend_rows: dict[str, tuple[tuple[str, dict[str, float]], ...]] = {
+            s: tuple((f, self._pair_u_by_student[s][f]) for f in self._friends_list[s])
+            for s in self._students
+        }
+        # Follower rows also carry the follower's lambda, since every follower term is scaled by it.
+        # Followers with lambda == 0 contribute nothing to any overlap delta and are left out.
+        self._follower_rows: dict[str, tuple[tuple[str, float, dict[str, float]], ...]] = {
+            s: tuple(
+                (x, self._lambda_by_student[x], self._pair_u_by_student[x][s])
+                for x in self._followers_list[s]
+                if self._lambda_by_student[x] != 0.0
+            )
+            for s in self._students
         }
 
+        # Pair preferences regrouped by course: student -> course -> ((friend_id, PairU), ...), in
+        # sorted friend order. Per-course overlap sums walk only the friends with a preference
+        # for that course, adding the nonzero terms in the same order as the full friend loop.
+        self._friends_by_course: dict[str, dict[str, tuple[tuple[str, float], ...]]] = {}
+        for s in self._students:
+            by_course: dict[str, list[tuple[str, float]]] = {}
+            for friend_id, weights in self._friend_rows[s]:
+                for course_id, pair_u in weights.items():
+                    by_course.setdefault(course_id, []).append((friend_id, pair_u))
+            self._friends_by_course[s] = {c: tuple(entries) for c, entries in by_course.items()}
+
+        # Courses each student has at least one friend preference on.
+        self._friend_courses: dict[str, frozenset[str]] = {
+            s: frozenset(self._friends_by_course[s]) for s in self._students
+        }
+
+        # Students whose FriendBonus for course c depends on friend b holding c, as [b][c]. Nested
+        # string-keyed dicts avoid building and hashing a (b, c) tuple on every invalidation.
+        self._bonus_dependents: dict[str, dict[str, list[str]]] = {s: {} for s in self._students}
+        for student_id_a, student_id_b, course_id in pair_keys:
+            self._bonus_dependents[student_id_b].setdefault(course_id, []).append(student_id_a)
+
+        # Reactive FriendBonus per student and course, filled lazily during the draft and add/drop
+        # passes. An entry is dropped whenever a friend gains or loses that course, and recomputed
+        # on next use in sorted-friend order, so cached values match _friend_bonus_reactive exactly.
+        self._friend_bonus_cache: dict[str, dict[str, float]] = {s: {} for s in self._students}
+        # Bucketed total utility round(Base + λ·FriendBonus, 9) per student and course for the
+        # add/drop ranking, invalidated together with the friend bonus it is derived from.
+        self._utility_bucket_cache: dict[str, dict[str, float]] = {s: {} for s in self._students}
+
     # ---- Utility model -------------------------------------------------
 
     def _base_utility(self, student_id: str, course_id: str) -> float:
         """Compute Base(student, course) from Table 1 Position only."""
 
-        return self._base_u_by_key.get((student_id, course_id), 0.0)
+        return self._base_u_by_student[student_id].get(course_id, 0.0)
 
     def _position_a(self, student_id: str, course_id: str) -> int:
         """
@@ -167,8 +259,7 @@ class _HbsSocialDraftEngine:
         Missing preferences are treated as a very poor rank.
         """
 
-        row = self._indiv_by_key.get((student_id, course_id))
-        return row.position if row is not None else self._MISSING_POSITION
+        return self._position_by_student[student_id].get(course_id, self._MISSING_POSITION)
 
     def _score_a(self, student_id: str, course_id: str) -> int:
         """
@@ -177,15 +268,14 @@ class _HbsSocialDraftEngine:
         Missing preferences are treated as very low score.
         """
 
-        row = self._indiv_by_key.get((student_id, course_id))
-        return row.score if row is not None else self._MISSING_SCORE
+        return self._score_by_student[student_id].get(course_id, self._MISSING_SCORE)
 
     def _friend_preference_utility(self, student_id: str, friend_id: str, course_id: str) -> float:
         """
         Compute the directed friend preference utility from Table 2: A's preference for B in a course.
         """
 
-        return self._pair_u_by_key.get((student_id, friend_id, course_id), 0.0)
+        return self._pair_u_by_student.get(student_id, {}).get(friend_id, {}).get(course_id, 0.0)
 
     def _friend_bonus_reactive(self, student_id: str, course_id: str) -> float:
         """
@@ -195,15 +285,32 @@ class _HbsSocialDraftEngine:
         """
 
         total = 0.0
-        for friend_id in self._friends_list.get(student_id, ()):
-            if course_id in self._alloc_set.get(friend_id, set()):
-                total += self._friend_preference_utility(student_id, friend_id, course_id)
+        alloc_set = self._alloc_set
+        for friend_id, pair_u in self._friends_by_course[student_id].get(course_id, ()):
+            if course_id in alloc_set[friend_id]:
+                total += pair_u
         return total
 
+    def _friend_bonus_cached(self, student_id: str, course_id: str) -> float:
+        """Memoized _friend_bonus_reactive, kept valid by _allocation_changed."""
+
+        cache = self._friend_bonus_cache[student_id]
+        bonus = cache.get(course_id)
+        if bonus is None:
+            bonus = cache[course_id] = self._friend_bonus_reactive(student_id, course_id)
+        return bonus
+
+    def _allocation_changed(self, student_id: str, course_id: str) -> None:
+        """Invalidate cached friend bonuses after `student_id` gains or loses `course_id`."""
+
+        for dependent_id in self._bonus_dependents[student_id].get(course_id, ()):
+            self._friend_bonus_cache[dependent_id].pop(course_id, None)
+            self._utility_bucket_cache[dependent_id].pop(course_id, None)
+
     def _utility_components(self, student_id: str, course_id: str) -> tuple[float, float, float]:
         base = self._base_utility(student_id, course_id)
         friend_bonus = self._friend_bonus_reactive(student_id, course_id)
-        total = base + self._lambda_by_student.get(student_id, self._DEFAULT_LAMBDA) * friend_bonus
+        total = base + self._lambda_by_student[student_id] * friend_bonus
         return total, base, friend_bonus
 
     # ---- Improvement objective (order-independent) ---------------------
@@ -213,85 +320,77 @@ class _HbsSocialDraftEngine:
         Order-independent welfare contribution for a single student based on the final allocation.
 
         W_s = Σ_{c ∈ Alloc(s)} [ Base(s,c) + λ * FriendOverlap(s,c) ]
+
+        Computed as base_sum + λ * friend_overlap_sum from one components pass, the same
+        form the summary metrics use.
         """
 
-        friends = self._friends_list.get(student_id, ())
-        lambda_ = self._lambda_by_student.get(student_id, self._DEFAULT_LAMBDA)
-        total = 0.0
-        student_courses = self._alloc_set[student_id]
-        for course_id in sorted(student_courses):
-            total += self._base_utility(student_id, course_id)
-            for friend_id in friends:
-                if course_id in self._alloc_set[friend_id]:
-                    total += lambda_ * self._friend_preference_utility(
-                        student_id, friend_id, course_id
-                    )
-        return total
+        base_sum, friend_sum, _overlaps = self._student_welfare_components(student_id)
+        return base_sum + self._lambda_by_student[student_id] * friend_sum
 
-    def _student_welfare_components(self, student_id: str) -> tuple[float, float]:
+    def _student_welfare_components(self, student_id: str) -> tuple[float, float, int]:
         """
-        Return (base_sum, friend_overlap_sum) for the final allocation.
+        Return (base_sum, friend_overlap_sum, overlap_count) for the final allocation.
+
+        overlap_count is the number of (friend, course) overlaps behind friend_overlap_sum,
+        counted in the same pass.
         """
 
         base_sum = 0.0
         friend_sum = 0.0
-        friends = self._friends_list.get(student_id, ())
-        for course_id in sorted(self._alloc_set[student_id]):
-            base_sum += self._base_utility(student_id, course_id)
-            for friend_id in friends:
-                if course_id in self._alloc_set[friend_id]:
-                    friend_sum += self._friend_preference_utility(student_id, friend_id, course_id)
-        return base_sum, friend_sum
+        overlaps = 0
+        alloc_set = self._alloc_set
+        base_s = self._base_u_by_student[student_id]
+        friends_by_course = self._friends_by_course[student_id]
+        for course_id in self._alloc_sorted[student_id]:
+            base_sum += base_s.get(course_id, 0.0)
+            for friend_id, pair_u in friends_by_course.get(course_id, ()):
+                if course_id in alloc_set[friend_id]:
+                    friend_sum += pair_u
+                    overlaps += 1
+        return base_sum, friend_sum, overlaps
 
     def _global_welfare(self) -> float:
         """Global welfare W(allocation) as a sum of per-student welfare contributions."""
 
         return sum(self._student_welfare(student_id) for student_id in self._students)
 
-    def _max_possible_base(self, student_id: str) -> float:
-        values = [self._base_utility(student_id, course_id) for course_id in self._courses]
-        values.sort(reverse=True)
-        return sum(values[: self._config.max_courses])
+    def _max_possible_bounds(self, student_id: str) -> tuple[float, float, float, int]:
+        """
+        Return per-student upper bounds (max_base, max_total, max_friend, max_overlaps).
+
+        Each bound is the sum of the student's best max_courses per-course values of:
+          - Base(s,c)
+          - Base(s,c) + λ * Σ_friends PairU(s,f,c)   (every listed friend in the course)
+          - Σ_friends PairU(s,f,c)
+          - number of friends with a preference for c
+        All four share one pass over the courses.
+        """
 
-    def _max_possible_total_upper(self, student_id: str) -> float:
-        lambda_ = self._lambda_by_student.get(student_id, self._DEFAULT_LAMBDA)
-        friends = self._friends_list.get(student_id, ())
-        values: list[float] = []
-        for course_id in self._courses:
-            base = self._base_utility(student_id, course_id)
-            friend_sum = 0.0
-            for friend_id in friends:
-                friend_sum += self._friend_preference_utility(student_id, friend_id, course_id)
-            values.append(base + lambda_ * friend_sum)
-        values.sort(reverse=True)
-        return sum(values[: self._config.max_courses])
-
-    def _max_possible_friend_upper(self, student_id: str) -> float:
-        friends = self._friends_list.get(student_id, ())
-        if not friends:
-            return 0.0
-        values: list[float] = []
-        for course_id in self._courses:
-            friend_sum = 0.0
-            for friend_id in friends:
-                friend_sum += self._friend_preference_utility(student_id, friend_id, course_id)
-            values.append(friend_sum)
-        values.sort(reverse=True)
-        return sum(values[: self._config.max_courses])
-
-    def _max_possible_overlap_count(self, student_id: str) -> int:
-        friends = self._friends_list.get(student_id, ())
-        if not friends:
-            return 0
+        k = self._config.max_courses
+        lambda_ = self._lambda_by_student[student_id]
+        base_s = self._base_u_by_student[student_id]
+        friends_by_course = self._friends_by_course[student_id]
+        base_values: list[float] = []
+        total_values: list[float] = []
+        friend_values: list[float] = []
         counts: list[int] = []
         for course_id in self._courses:
-            count = 0
-            for friend_id in friends:
-                if (student_id, friend_id, course_id) in self._pair_by_key:
-                    count += 1
-            counts.append(count)
-        counts.sort(reverse=True)
-        return sum(counts[: self._config.max_courses])
+            base = base_s.get(course_id, 0.0)
+            entries = friends_by_course.get(course_id, ())
+            friend_sum = 0.0
+            for _friend_id, pair_u in entries:
+                friend_sum += pair_u
+            base_values.append(base)
+            total_values.append(base + lambda_ * friend_sum)
+            friend_values.append(friend_sum)
+            counts.append(len(entries))
+
+        max_base = sum(nlargest(k, base_values))
+        max_total = sum(nlargest(k, total_values))
+        if not friends_by_course:
+            return max_base, max_total, 0.0, 0
+        return max_base, max_total, sum(nlargest(k, friend_values)), sum(nlargest(k, counts))
 
     # ---- Improvement moves --------------------------------------------
 
@@ -312,6 +411,16 @@ class _HbsSocialDraftEngine:
         self._alloc_set[s2].remove(c2)
         self._alloc_set[s2].add(c1)
 
+        self._alloc_sorted[s1].remove(c1)
+        insort(self._alloc_sorted[s1], c2)
+        self._alloc_sorted[s2].remove(c2)
+        insort(self._alloc_sorted[s2], c1)
+
+        self._allocation_changed(s1, c1)
+        self._allocation_changed(s1, c2)
+        self._allocation_changed(s2, c2)
+        self._allocation_changed(s2, c1)
+
     def _swap_delta(self, s1: str, c1: str, s2: str, c2: str) -> float:
         """
         Compute ΔW for swapping courses c1/c2 between students s1/s2.
@@ -321,91 +430,84 @@ class _HbsSocialDraftEngine:
           - followers of s1/s2 whose overlap with s1/s2 changes due to the swapped courses
 
         This avoids recomputing full per-student welfare for large instances.
+        This is the innermost kernel of the swap phase, so the lookup tables are bound to
+        locals and read directly instead of going through the utility helper methods.
         """
         alloc_set = self._alloc_set
+        base_s1 = self._base_u_by_student[s1]
+        base_s2 = self._base_u_by_student[s2]
 
-        def _has_after(student_id: str, course_id: str) -> bool:
-            if student_id == s1:
-                if course_id == c1:
-                    return False
-                if course_id == c2:
-                    return True
-                return course_id in alloc_set[s1]
-            if student_id == s2:
-                if course_id == c2:
-                    return False
-                if course_id == c1:
-                    return True
-                return course_id in alloc_set[s2]
-            return course_id in alloc_set[student_id]
-
-        friends_s1 = self._friends_list.get(s1, ())
-        friends_s2 = self._friends_list.get(s2, ())
+        friends_s1 = self._friends_by_course[s1]
+        friends_s2 = self._friends_by_course[s2]
 
         # ---- Self utility deltas (s1, s2) -----------------------------------
 
         delta = 0.0
 
         # Base terms change only for swapped courses for s1 and s2.
-        delta += self._base_utility(s1, c2) - self._base_utility(s1, c1)
-        delta += self._base_utility(s2, c1) - self._base_utility(s2, c2)
+        delta += base_s1.get(c2, 0.0) - base_s1.get(c1, 0.0)
+        delta += base_s2.get(c1, 0.0) - base_s2.get(c2, 0.0)
 
         # Friend overlap terms for s1 and s2 change only for swapped courses.
-        lambda_s1 = self._lambda_by_student.get(s1, self._DEFAULT_LAMBDA)
-        lambda_s2 = self._lambda_by_student.get(s2, self._DEFAULT_LAMBDA)
+        lambda_s1 = self._lambda_by_student[s1]
+        lambda_s2 = self._lambda_by_student[s2]
         if lambda_s1 != 0.0:
             # s1 loses c1
             removed = 0.0
-            for f in friends_s1:
+            for f, pair_u in friends_s1.get(c1, ()):
                 if c1 in alloc_set[f]:
-                    removed += self._friend_preference_utility(s1, f, c1)
+                    removed += pair_u
             # s1 gains c2
             added = 0.0
-            for f in friends_s1:
-                if _has_after(f, c2):
-                    added += self._friend_preference_utility(s1, f, c2)
+            for f, pair_u in friends_s1.get(c2, ()):
+                # After the swap s1 holds c2 and s2 no longer does; others are unchanged.
+                if f != s2 and (f == s1 or c2 in alloc_set[f]):
+                    added += pair_u
             delta += lambda_s1 * (added - removed)
 
+        if lambda_s2 != 0.0:
             # s2 loses c2
             removed = 0.0
-            for f in friends_s2:
+            for f, pair_u in friends_s2.get(c2, ()):
                 if c2 in alloc_set[f]:
-                    removed += self._friend_preference_utility(s2, f, c2)
+                    removed += pair_u
             # s2 gains c1
             added = 0.0
-            for f in friends_s2:
-                if _has_after(f, c1):
-                    added += self._friend_preference_utility(s2, f, c1)
+            for f, pair_u in friends_s2.get(c1, ()):
+                if f != s1 and (f == s2 or c1 in alloc_set[f]):
+                    added += pair_u
             delta += lambda_s2 * (added - removed)
 
         # ---- Follower deltas (only overlap terms can change) -----------------
 
-        followers_s1 = self._followers_list.get(s1, ())
-        for x in followers_s1:
+        for x, lambda_x, weights in self._follower_rows.get(s1, ()):
             if x == s1 or x == s2:
                 continue
             alloc_x = alloc_set[x]
-            lambda_x = self._lambda_by_student.get(x, self._DEFAULT_LAMBDA)
             if c1 in alloc_x:
-                delta -= lambda_x * self._friend_preference_utility(x, s1, c1)
+                delta -= lambda_x * weights.get(c1, 0.0)
             if c2 in alloc_x:
-                delta += lambda_x * self._friend_preference_utility(x, s1, c2)
+                delta += lambda_x * weights.get(c2, 0.0)
 
-        followers_s2 = self._followers_list.get(s2, ())
-        for x in followers_s2:
+        for x, lambda_x, weights in self._follower_rows.get(s2, ()):
             if x == s1 or x == s2:
                 continue
             alloc_x = alloc_set[x]
-            lambda_x = self._lambda_by_student.get(x, self._DEFAULT_LAMBDA)
             if c2 in alloc_x:
-                delta -= lambda_x * self._friend_preference_utility(x, s2, c2)
+                delta -= lambda_x * weights.get(c2, 0.0)
             if c1 in alloc_x:
-                delta += lambda_x * self._friend_preference_utility(x, s2, c1)
+                delta += lambda_x * weights.get(c1, 0.0)
 
         return delta
 
     # ---- Draft execution ----------------------------------------------
 
+    def _rng_block(self, n: int) -> list[float]:
+        """Draw the next n tie-break values from the run RNG in one call."""
+
+        rng_random = self._rng.random
+        return [rng_random() for _ in repeat(None, n)]
+
     def _assert_student_state(self, student_id: str) -> None:
         alloc_list = self._alloc_list[student_id]
         alloc_set = self._alloc_set[student_id]
@@ -417,23 +519,27 @@ class _HbsSocialDraftEngine:
             raise AssertionError(f"Duplicate course in allocation for {student_id}")
 
     def _assert_course_capacity(self, course_id: str) -> None:
-        assigned = sum(1 for s in self._students if course_id in self._alloc_set[s])
+        """Check the maintained capacity counter for a course against a recount of its holders."""
+
         capacity = self._config.default_capacity
+        left = self._capacity_left[course_id]
+        if not 0 <= left <= capacity:
+            raise AssertionError(
+                f"Capacity left out of range for {course_id}: {left} (capacity {capacity})"
+            )
+
+        assigned = sum(1 for s in self._students if course_id in self._alloc_set[s])
         if assigned > capacity:
             raise AssertionError(f"Capacity exceeded for {course_id}: {assigned} > {capacity}")
         expected_left = capacity - assigned
-        if self._capacity_left.get(course_id) != expected_left:
-            raise AssertionError(
-                f"Capacity left mismatch for {course_id}: "
-                f"{self._capacity_left.get(course_id)} != {expected_left}"
-            )
+        if left != expected_left:
+            raise AssertionError(f"Capacity left mismatch for {course_id}: {left} != {expected_left}")
 
     def _assert_swap_invariants(self, s1: str, c1: str, s2: str, c2: str) -> None:
         self._assert_student_state(s1)
         self._assert_student_state(s2)
-        if self._config.sanity_checks:
-            self._assert_course_capacity(c1)
-            self._assert_course_capacity(c2)
+        self._assert_course_capacity(c1)
+        self._assert_course_capacity(c2)
 
     def run(self) -> RunResult:
         """
@@ -490,6 +596,11 @@ class _HbsSocialDraftEngine:
         self._rng.shuffle(order)
 
         pick_log: list[PickLogRow] = []
+        capacity_left = self._capacity_left
+        friend_bonus_cached = self._friend_bonus_cached
+        # One candidate buffer for the whole draft, cleared per turn rather than reallocated.
+        scored: list[tuple[float, int, int, float, str, float, float, float]] = []
+        scored_append = scored.append
 
         for round_index in range(1, rounds + 1):
             if self._config.progress:
@@ -497,13 +608,8 @@ class _HbsSocialDraftEngine:
             turn_order = order if round_index % 2 == 1 else list(reversed(order))
 
             for student_id in turn_order:
-                candidates = [
-                    course_id
-                    for course_id in self._courses
-                    if self._capacity_left[course_id] > 0 and course_id not in self._alloc_set[student_id]
-                ]
-                if not candidates:
-                    continue
+                alloc_set = self._alloc_set[student_id]
+                lambda_ = self._lambda_by_student[student_id]
 
                 # We want deterministic but tie-breakable picks:
                 #   1) max utility (bucketed to treat "similar utility" as ties)
@@ -511,31 +617,43 @@ class _HbsSocialDraftEngine:
                 #   3) max raw score (Score from table A)
                 #   4) seeded random (break remaining ties)
                 #   5) stable course id (as a final deterministic tie-breaker)
-                scored: list[tuple[float, int, int, float, str, float, float, float]] = []
-                for course_id in candidates:
-                    u, base, friend_bonus = self._utility_components(student_id, course_id)
+                # Each entry leads with its ranking key (position negated so larger is better),
+                # so plain tuple comparison ranks it; course ids are unique, so comparison
+                # never reaches the trailing payload. Tie-break draws are taken as one block per
+                # turn, one per feasible course in course order (the same stream as drawing inline).
+                feasible = [
+                    row
+                    for row in self._pick_rows[student_id]
+                    if capacity_left[row[0]] > 0 and row[0] not in alloc_set
+                ]
+                # The utility bucket decides almost every pick on its own, so full entries are only
+                # built for candidates in the best bucket seen so far; the remaining keys are
+                # compared only among those ties.
+                rnds = self._rng_block(len(feasible))
+                scored.clear()
+                best_bucket = -math.inf
+                for (course_id, base, neg_position, score), rnd in zip(feasible, rnds):
+                    friend_bonus = friend_bonus_cached(student_id, course_id)
+                    u = base + lambda_ * friend_bonus
                     u_bucket = round(u, 9)
-                    scored.append(
-                        (
-                            u_bucket,
-                            self._position_a(student_id, course_id),
-                            self._score_a(student_id, course_id),
-                            self._rng.random(),
-                            course_id,
-                            u,
-                            base,
-                            friend_bonus,
-                        )
+                    if u_bucket < best_bucket:
+                        continue
+                    if u_bucket > best_bucket:
+                        best_bucket = u_bucket
+                        scored.clear()
+                    scored_append(
+                        (u_bucket, neg_position, score, rnd, course_id, u, base, friend_bonus)
                     )
+                if not scored:
+                    continue
 
-                _u_bucket, _pos, _score, _rnd, course_id_star, u, base, friend_bonus = max(
-                    scored,
-                    key=lambda t: (t[0], -t[1], t[2], t[3], t[4]),
-                )
+                _u_bucket, _neg_pos, _score, _rnd, course_id_star, u, base, friend_bonus = max(scored)
 
                 self._alloc_list[student_id].append(course_id_star)
                 self._alloc_set[student_id].add(course_id_star)
-                self._capacity_left[course_id_star] -= 1
+                insort(self._alloc_sorted[student_id], course_id_star)
+                capacity_left[course_id_star] -= 1
+                self._allocation_changed(student_id, course_id_star)
 
                 pick_log.append(
                     PickLogRow(
@@ -550,8 +668,128 @@ class _HbsSocialDraftEngine:
 
         return pick_log
 
+    def _best_swap_full(self, eps: float) -> tuple[float, tuple[str, str, str, str, str] | None]:
+        """
+        Exhaustive swap search: every (s1 < s2, c1 in A(s1), c2 in A(s2)) feasible move.
+
+        Returns (best ΔW, best move); ties within eps go to the smallest move key.
+        """
+
+        alloc_set = self._alloc_set
+        swap_delta = self._swap_delta
+        best_delta = 0.0
+        best_move: tuple[str, str, str, str, str] | None = None
+
+        # Skip students with nothing to swap.
+        alloc_sorted = self._alloc_sorted
+        allocated = [
+            (student_id, alloc_sorted[student_id])
+            for student_id in self._students
+            if alloc_sorted[student_id]
+        ]
+
+        for i, (s1, alloc1) in enumerate(allocated):
+            set1 = alloc_set[s1]
+            for s2, alloc2 in allocated[i + 1 :]:
+                set2 = alloc_set[s2]
+                # Feasible c2: not already held by s1 (this also rules out c1 == c2).
+                alloc2_free = [c2 for c2 in alloc2 if c2 not in set1]
+                if not alloc2_free:
+                    continue
+                for c1 in alloc1:
+                    if c1 in set2:
+                        continue
+                    for c2 in alloc2_free:
+                        delta = swap_delta(s1, c1, s2, c2)
+
+                        if delta > best_delta + eps:
+                            best_delta = delta
+                            best_move = ("swap", s1, s2, c1, c2)
+                        elif abs(delta - best_delta) <= eps and best_move is not None:
+                            move_key = ("swap", s1, s2, c1, c2)
+                            if move_key < best_move:
+                                best_move = move_key
+
+        return best_delta, best_move
+
+    def _swap_candidate_students(self, k: int) -> dict[str, tuple[str, ...]]:
+        """
+        For each course, the k students with the highest potential utility for it.
+
+        Potential utility is Base + λ * (sum of the student's friend weights for the course),
+        i.e. the utility if every listed friend held the course. Ties go to the smaller id.
+        """
+
+        candidates: dict[str, tuple[str, ...]] = {}
+        for course_id in self._courses:
+            # Partial selection of the k best instead of sorting every student per course.
+            ranked = nsmallest(
+                k,
+                self._students,
+                key=lambda s: (
+                    -(
+                        self._base_u_by_student[s].get(course_id, 0.0)
+                        + self._lambda_by_student[s]
+                        * sum(pair_u for _f, pair_u in self._friends_by_course[s].get(course_id, ()))
+                    ),
+                    s,
+                ),
+            )
+            candidates[course_id] = tuple(ranked)
+        return candidates
+
+    def _best_swap_top_k(
+        self,
+        eps: float,
+        swap_candidates: dict[str, tuple[str, ...]],
+    ) -> tuple[float, tuple[str, str, str, str, str] | None]:
+        """
+        Heuristic swap search restricted to promising moves.
+
+        s1 only offers c1 to the top-k students for c1 (see _swap_candidate_students), and
+        only takes back a c2 it values at least as much as c1 by Base or that it shares a
+        friend preference on. Moves are keyed with the smaller student id first, so ties
+        resolve exactly as in the exhaustive search.
+        """
+
+        alloc_set = self._alloc_set
+        swap_delta = self._swap_delta
+        best_delta = 0.0
+        best_move: tuple[str, str, str, str, str] | None = None
+
+        for s1 in self._students:
+            set1 = alloc_set[s1]
+            if not set1:
+                continue
+            base_s1 = self._base_u_by_student[s1]
+            friend_courses_s1 = self._friend_courses[s1]
+            for c1 in self._alloc_sorted[s1]:
+                base_c1 = base_s1.get(c1, 0.0)
+                for s2 in swap_candidates[c1]:
+                    if s2 == s1:
+                        continue
+                    set2 = alloc_set[s2]
+                    if c1 in set2:
+                        continue
+                    for c2 in self._alloc_sorted[s2]:
+                        if c2 in set1:
+                            continue
+                        if base_s1.get(c2, 0.0) < base_c1 and c2 not in friend_courses_s1:
+                            continue
+                        delta = swap_delta(s1, c1, s2, c2)
+                        move_key = ("swap", s1, s2, c1, c2) if s1 < s2 else ("swap", s2, s1, c2, c1)
+
+                        if delta > best_delta + eps:
+                            best_delta = delta
+                            best_move = move_key
+                        elif abs(delta - best_delta) <= eps and best_move is not None:
+                            if move_key < best_move:
+                                best_move = move_key
+
+        return best_delta, best_move
+
     # ---- swap moves phase (optional) -------------------------------------------------------
-    def _run_iterative_improvement(self, n: int, *, start_iteration: int) -> list[PostAllocLogRow]:
+    def _run_iterative_improvement(self, n: int, *, start_iteration: int) -> PostAllocLog:
         """
         Phase B: deterministic local search for exactly n iterations.
 
@@ -563,42 +801,25 @@ class _HbsSocialDraftEngine:
         """
 
         if n <= 0:
-            return []
+            return PostAllocLog()
 
         eps = 1e-12
-        improvement_log: list[PostAllocLogRow] = []
+        improvement_log = PostAllocLog()
         swap_count = 0
 
-        for offset in range(n):
-            iteration = start_iteration + offset
-            best_delta = 0.0
-            best_move: tuple[str, str, str, str, str] | None = None
+        # Running W(allocation), advanced by each applied ΔW. It is only needed to verify the
+        # deltas, so the full O(S·k·f) recompute happens once here and then on check swaps only.
+        welfare = self._global_welfare() if self._config.delta_check_every > 0 else None
 
-            for i, s1 in enumerate(self._students):
-                alloc1 = sorted(self._alloc_set[s1])
-                if not alloc1:
-                    continue
-                for s2 in self._students[i + 1 :]:
-                    alloc2 = sorted(self._alloc_set[s2])
-                    if not alloc2:
-                        continue
-                    for c1 in alloc1:
-                        for c2 in alloc2:
-                            if c1 == c2:
-                                continue
-                            if c2 in self._alloc_set[s1]:
-                                continue
-                            if c1 in self._alloc_set[s2]:
-                                continue
-
-                            delta = self._swap_delta(s1, c1, s2, c2)
-                            move_key = ("swap", s1, s2, c1, c2)
+        top_k = self._config.swap_top_k
+        swap_candidates = self._swap_candidate_students(top_k) if top_k is not None else None
 
-                            if delta > best_delta + eps:
-                                best_delta = delta
-                                best_move = move_key
-                            elif abs(delta - best_delta) <= eps and best_move is not None and move_key < best_move:
-                                best_move = move_key
+        for offset in range(n):
+            iteration = start_iteration + offset
+            if swap_candidates is None:
+                best_delta, best_move = self._best_swap_full(eps)
+            else:
+                best_delta, best_move = self._best_swap_top_k(eps, swap_candidates)
 
             if best_move is not None and best_delta > eps:
                 _tag, s1, s2, c1, c2 = best_move
@@ -606,61 +827,36 @@ class _HbsSocialDraftEngine:
                     self._config.delta_check_every > 0
                     and (swap_count + 1) % self._config.delta_check_every == 0
                 )
+                self._swap_courses(s1, c1, s2, c2)
+                if welfare is not None:
+                    welfare += best_delta
                 if check_delta:
-                    before = self._global_welfare()
-                    self._swap_courses(s1, c1, s2, c2)
-                    after = self._global_welfare()
-                    actual_delta = after - before
-                    if abs(actual_delta - best_delta) > 1e-8:
+                    actual = self._global_welfare()
+                    if abs(actual - welfare) > 1e-8:
                         raise AssertionError(
-                            f"Swap delta mismatch: expected {best_delta:.12f}, got {actual_delta:.12f}"
+                            f"Swap delta mismatch: tracked welfare {welfare:.12f}, "
+                            f"recomputed {actual:.12f}"
                         )
-                else:
-                    self._swap_courses(s1, c1, s2, c2)
+                    welfare = actual
                 swap_count += 1
-                self._assert_swap_invariants(s1, c1, s2, c2)
+                if self._config.sanity_checks:
+                    self._assert_swap_invariants(s1, c1, s2, c2)
                 if self._config.progress:
                     print(
                         f"Iter {iteration}/{self._config.total_iters}: IMPROVE swap "
                         f"({s1}:{c1}) <-> ({s2}:{c2}) Δ={best_delta:.6f}",
                         flush=True,
                     )
-                improvement_log.append(
-                    PostAllocLogRow(
-                        iteration=iteration,
-                        event_type="SWAP",
-                        student_id=None,
-                        dropped_courses=None,
-                        added_courses=None,
-                        swap_student_1=s1,
-                        swap_course_1=c1,
-                        swap_student_2=s2,
-                        swap_course_2=c2,
-                        delta_utility=best_delta,
-                    )
-                )
+                improvement_log.append_swap(iteration, s1, c1, s2, c2, best_delta)
             else:
                 if self._config.progress:
                     print(f"Iter {iteration}/{self._config.total_iters}: IMPROVE no-op", flush=True)
-                improvement_log.append(
-                    PostAllocLogRow(
-                        iteration=iteration,
-                        event_type="",
-                        student_id=None,
-                        dropped_courses=None,
-                        added_courses=None,
-                        swap_student_1=None,
-                        swap_course_1=None,
-                        swap_student_2=None,
-                        swap_course_2=None,
-                        delta_utility=None,
-                    )
-                )
+                improvement_log.append_noop(iteration)
 
         return improvement_log
     
     # ---- ADD/DROP phase -------------------------------------------------------
-    def _run_add_drop_improvement(self, n: int, *, start_iteration: int) -> list[PostAllocLogRow]:
+    def _run_add_drop_improvement(self, n: int, *, start_iteration: int) -> PostAllocLog:
         """
         Phase B (HBS-style): add/drop passes over students using only courses with spare capacity.
 
@@ -668,9 +864,19 @@ class _HbsSocialDraftEngine:
         """
 
         if n <= 0:
-            return []
-
-        post_log: list[PostAllocLogRow] = []
+            return PostAllocLog()
+
+        post_log = PostAllocLog()
+        scored: list[tuple[float, int, int, float, str]] = []
+        scored_append = scored.append
+        capacity_left = self._capacity_left
+        friend_bonus_cached = self._friend_bonus_cached
+        max_courses = self._config.max_courses
+        # Students whose last turn kept their allocation with a ranking that did not hinge on the
+        # random tie-break, with the candidate list it saw. While no friend of theirs changes a
+        # course (see below) and the candidates are the same, the turn would be a no-op again.
+        settled: set[str] = set()
+        settled_candidates: dict[str, list[tuple[str, float, int, int]]] = {}
 
         for offset in range(n):
             iteration = start_iteration + offset
@@ -683,90 +889,92 @@ class _HbsSocialDraftEngine:
 
             for student_id in order:
                 current_set = self._alloc_set[student_id]
-                candidates: set[str] = set(current_set)
-                for course_id in self._courses:
-                    if self._capacity_left[course_id] > 0:
-                        candidates.add(course_id)
+                # Candidates in the fixed course order (held or still open), so the tie-break
+                # draws map to courses independently of set iteration order. They are the draft's
+                # static rows (course_id, Base, -PositionA, ScoreA), so scoring a candidate only
+                # looks up its cached utility bucket.
+                candidates = [
+                    row
+                    for row in self._pick_rows[student_id]
+                    if capacity_left[row[0]] > 0 or row[0] in current_set
+                ]
                 if not candidates:
                     continue
+                if student_id in settled and candidates == settled_candidates[student_id]:
+                    # Draw the tie-break values anyway so the RNG stream matches a scored turn.
+                    self._rng_block(len(candidates))
+                    continue
 
-                scored: list[tuple[float, int, int, float, str]] = []
-                for course_id in candidates:
-                    u, _base, _friend_bonus = self._utility_components(student_id, course_id)
-                    u_bucket = round(u, 9)
-                    scored.append(
-                        (
-                            u_bucket,
-                            self._position_a(student_id, course_id),
-                            self._score_a(student_id, course_id),
-                            self._rng.random(),
-                            course_id,
-                        )
-                    )
-                scored.sort(key=lambda t: (t[0], -t[1], t[2], t[3], t[4]), reverse=True)
-
-                k = min(self._config.max_courses, len(scored))
-                desired_list = [item[4] for item in scored[:k]]
+                # Same ranking key as the draft pick (position negated), compared as plain tuples.
+                lambda_ = self._lambda_by_student[student_id]
+                bucket_cache = self._utility_bucket_cache[student_id]
+                rnds = self._rng_block(len(candidates))
+                scored.clear()
+                for (course_id, base, neg_position, score), rnd in zip(candidates, rnds):
+                    u_bucket = bucket_cache.get(course_id)
+                    if u_bucket is None:
+                        u = base
+                        if lambda_ != 0.0:
+                            u += lambda_ * friend_bonus_cached(student_id, course_id)
+                        u_bucket = bucket_cache[course_id] = round(u, 9)
+                    scored_append((u_bucket, neg_position, score, rnd, course_id))
+
+                # Only the best max_courses entries matter: select them instead of sorting all.
+                # One extra entry shows whether the cut-off fell inside a tie-break group.
+                top = nlargest(max_courses + 1, scored)
+                desired_list = [item[4] for item in top[:max_courses]]
                 desired_set = set(desired_list)
-
-                dropped = sorted(current_set - desired_set)
-                added = sorted(desired_set - current_set)
-                if not dropped and not added:
+                # Most turns keep the allocation: one set comparison settles that before any
+                # differences are built and sorted.
+                if desired_set == current_set:
+                    if len(top) <= max_courses or top[max_courses - 1][:3] != top[max_courses][:3]:
+                        settled.add(student_id)
+                        settled_candidates[student_id] = candidates
                     continue
 
+                # Differences in course order for the log: dropped courses come out of the
+                # maintained sorted allocation in order, so only the few new courses get sorted.
+                current_sorted = self._alloc_sorted[student_id]
+                dropped = [c for c in current_sorted if c not in desired_set]
+                added = sorted([c for c in desired_list if c not in current_set])
+
                 for course_id in added:
-                    if self._capacity_left[course_id] <= 0:
+                    if capacity_left[course_id] <= 0:
                         raise AssertionError(f"Add/drop capacity exhausted for {course_id}")
 
                 for course_id in dropped:
-                    self._capacity_left[course_id] += 1
+                    capacity_left[course_id] += 1
                 for course_id in added:
-                    self._capacity_left[course_id] -= 1
+                    capacity_left[course_id] -= 1
 
-                old_list = self._alloc_list[student_id]
-                kept = [c for c in old_list if c in desired_set]
-                added_in_order = [c for c in desired_list if c not in old_list]
-                self._alloc_list[student_id] = kept + added_in_order
+                # Keep surviving courses in pick order, then append new ones in ranking order.
+                # Membership goes through the sets (captured before they are replaced below).
+                kept = [c for c in self._alloc_list[student_id] if c in desired_set]
+                kept.extend(c for c in desired_list if c not in current_set)
+                self._alloc_list[student_id] = kept
                 self._alloc_set[student_id] = desired_set
+                # The kept courses and the added ones are two sorted runs, which sort() merges.
+                new_sorted = [c for c in current_sorted if c in desired_set]
+                new_sorted.extend(added)
+                new_sorted.sort()
+                self._alloc_sorted[student_id] = new_sorted
+                dependents = self._bonus_dependents[student_id]
+                for course_id in dropped + added:
+                    self._allocation_changed(student_id, course_id)
+                    settled.difference_update(dependents.get(course_id, ()))
 
-                self._assert_student_state(student_id)
                 if self._config.sanity_checks:
+                    self._assert_student_state(student_id)
                     for course_id in dropped + added:
                         self._assert_course_capacity(course_id)
 
                 changed_in_pass = True
-                post_log.append(
-                    PostAllocLogRow(
-                        iteration=iteration,
-                        event_type="ADD_DROP",
-                        student_id=student_id,
-                        dropped_courses=tuple(dropped),
-                        added_courses=tuple(added),
-                        swap_student_1=None,
-                        swap_course_1=None,
-                        swap_student_2=None,
-                        swap_course_2=None,
-                        delta_utility=None,
-                    )
-                )
+                post_log.append_add_drop(iteration, student_id, tuple(dropped), tuple(added))
 
             if not changed_in_pass:
                 if self._config.progress:
                     print(f"Iter {iteration}/{self._config.total_iters}: ADD_DROP no-op", flush=True)
-                post_log.append(
-                    PostAllocLogRow(
-                        iteration=iteration,
-                        event_type="",
-                        student_id=None,
-                        dropped_courses=None,
-                        added_courses=None,
-                        swap_student_1=None,
-                        swap_course_1=None,
-                        swap_student_2=None,
-                        swap_course_2=None,
-                        delta_utility=None,
-                    )
-                )
+                post_log.append_noop(iteration)
 
         return post_log
 
@@ -782,18 +990,21 @@ class _HbsSocialDraftEngine:
         per_student_max_total: list[float] = []
         per_student_max_friend: list[float] = []
         per_student_max_overlaps: list[int] = []
+        per_student_overlaps: list[int] = []
 
         for student_id in self._students:
-            base_sum, friend_sum = self._student_welfare_components(student_id)
-            lambda_ = self._lambda_by_student.get(student_id, self._DEFAULT_LAMBDA)
+            base_sum, friend_sum, overlaps = self._student_welfare_components(student_id)
+            lambda_ = self._lambda_by_student[student_id]
             total = base_sum + lambda_ * friend_sum
             per_student_base.append(base_sum)
             per_student_friend.append(friend_sum)
             per_student_total.append(total)
-            per_student_max_base.append(self._max_possible_base(student_id))
-            per_student_max_total.append(self._max_possible_total_upper(student_id))
-            per_student_max_friend.append(self._max_possible_friend_upper(student_id))
-            per_student_max_overlaps.append(self._max_possible_overlap_count(student_id))
+            max_base, max_total, max_friend, max_overlaps = self._max_possible_bounds(student_id)
+            per_student_max_base.append(max_base)
+            per_student_max_total.append(max_total)
+            per_student_max_friend.append(max_friend)
+            per_student_max_overlaps.append(max_overlaps)
+            per_student_overlaps.append(overlaps)
 
         per_student_base_norm = [
             (u / max_b if max_b > 0.0 else 0.0)
@@ -827,6 +1038,7 @@ class _HbsSocialDraftEngine:
             per_student_max_base=per_student_max_base,
             per_student_max_friend=per_student_max_friend,
             per_student_max_overlaps=per_student_max_overlaps,
+            per_student_overlaps=per_student_overlaps,
         )
         return summary, metrics
 
@@ -842,6 +1054,7 @@ class _HbsSocialDraftEngine:
         per_student_max_base: list[float],
         per_student_max_friend: list[float],
         per_student_max_overlaps: list[int],
+        per_student_overlaps: list[int],
     ) -> ExtendedMetrics:
         n_students = len(self._students)
         total_base = sum(per_student_base)
@@ -850,8 +1063,12 @@ class _HbsSocialDraftEngine:
         total_max_total = sum(per_student_max_total)
         total_max_friend = sum(per_student_max_friend)
 
-        avg_courses = sum(len(self._alloc_set[s]) for s in self._students) / n_students
-        full_alloc = sum(1 for s in self._students if len(self._alloc_set[s]) >= self._config.max_courses)
+        # One tally of allocation sizes serves both the average and the full-allocation count.
+        size_counts = Counter(len(self._alloc_set[s]) for s in self._students)
+        avg_courses = sum(size * count for size, count in size_counts.items()) / n_students
+        full_alloc = sum(
+            count for size, count in size_counts.items() if size >= self._config.max_courses
+        )
         students_full_alloc_rate = full_alloc / n_students if n_students else 0.0
 
         unfilled_seats = sum(self._capacity_left.values())
@@ -861,41 +1078,34 @@ class _HbsSocialDraftEngine:
         ]
         course_fill_rate_mean = sum(fill_rates) / len(fill_rates) if fill_rates else 0.0
 
-        positions: list[int] = []
-        top1 = 0
-        top3 = 0
-        for student_id in self._students:
-            for course_id in self._alloc_set[student_id]:
-                row = self._indiv_by_key.get((student_id, course_id))
-                if row is None:
-                    continue
-                positions.append(row.position)
-                if row.position <= 1:
-                    top1 += 1
-                if row.position <= 3:
-                    top3 += 1
-        avg_position = sum(positions) / len(positions) if positions else 0.0
-        positions_sorted = sorted(positions)
-        median_position = positions_sorted[len(positions_sorted) // 2] if positions_sorted else 0.0
-        share_top1 = top1 / len(positions) if positions else 0.0
-        share_top3 = top3 / len(positions) if positions else 0.0
-
-        overlaps_total = 0
-        students_with_overlap = 0
+        # Tally allocated positions once; positions take few distinct values, so the median and
+        # top-k shares come from the tally instead of sorting every allocated position.
+        position_counts: Counter[int] = Counter()
         for student_id in self._students:
-            friends = self._friends_list.get(student_id, ())
-            if not friends:
-                continue
-            student_overlaps = 0
-            for course_id in self._alloc_set[student_id]:
-                for friend_id in friends:
-                    if (student_id, friend_id, course_id) not in self._pair_by_key:
-                        continue
-                    if course_id in self._alloc_set[friend_id]:
-                        student_overlaps += 1
-                        overlaps_total += 1
-            if student_overlaps > 0:
-                students_with_overlap += 1
+            position_s = self._position_by_student[student_id]
+            position_counts.update(
+                position_s[course_id] for course_id in self._alloc_set[student_id] if course_id in position_s
+            )
+        n_positions = position_counts.total()
+        top1 = sum(count for position, count in position_counts.items() if position <= 1)
+        top3 = sum(count for position, count in position_counts.items() if position <= 3)
+        avg_position = (
+            sum(position * count for position, count in position_counts.items()) / n_positions
+            if n_positions
+            else 0.0
+        )
+        median_position = 0.0
+        seen = 0
+        for position in sorted(position_counts):
+            seen += position_counts[position]
+            if seen > n_positions // 2:
+                median_position = position
+                break
+        share_top1 = top1 / n_positions if n_positions else 0.0
+        share_top3 = top3 / n_positions if n_positions else 0.0
+
+        overlaps_total = sum(per_student_overlaps)
+        students_with_overlap = sum(1 for count in per_student_overlaps if count > 0)
         avg_friend_overlaps = overlaps_total / n_students if n_students else 0.0
         share_students_with_overlap = students_with_overlap / n_students if n_students else 0.0
 
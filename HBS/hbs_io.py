@@ -1,84 +1,169 @@
 from __future__ import annotations
 
 import csv
+import os
+import sys
+from array import array
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
-from typing import Sequence
+from typing import Iterator, Union
 
 from .hbs_domain import (
     ExtendedMetrics,
-    IndividualPref,
-    PairPref,
+    IndividualPrefColumns,
+    PairPrefColumns,
     PickLogRow,
-    PostAllocLogRow,
+    PostAllocLog,
     RunSummary,
     StudentLambda,
 )
 
+# Input paths may be given as `str` or `Path`; readers hand them to `open()` unchanged.
+StrPath = Union[str, "os.PathLike[str]"]
 
-def _read_table_1(path: Path) -> list[IndividualPref]:
-    """Read Table 1 CSV (individual preferences) into strongly-typed records."""
-
-    rows: list[IndividualPref] = []
-    with path.open(newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        required = {"StudentID", "CourseID", "Score", "Position"}
-        if reader.fieldnames is None or not required.issubset(set(reader.fieldnames)):
-            raise ValueError(f"CSV A need to include rows: {sorted(required)} (file: {path})")
-        for r in reader:
-            rows.append(
-                IndividualPref(
-                    student_id=str(r["StudentID"]).strip(),
-                    course_id=str(r["CourseID"]).strip(),
-                    score=int(r["Score"]),
-                    position=int(r["Position"]),
-                )
-            )
-    return rows
-
-
-def _read_table_2(path: Path) -> list[PairPref]:
-    """Read Table 2 CSV (pair preferences) into strongly-typed records."""
-
-    rows: list[PairPref] = []
-    with path.open(newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        required = {"StudentID_A", "StudentID_B", "CourseID", "Position"}
-        fieldnames = set(reader.fieldnames or [])
-        if reader.fieldnames is None or not required.issubset(fieldnames):
-            raise ValueError(f"CSV B need to include rows: {sorted(required)} (file: {path})")
-        has_score = "Score" in fieldnames
-        for r in reader:
-            score_raw = str(r.get("Score", "")).strip() if has_score else ""
-            score = int(score_raw) if score_raw != "" else None
-            rows.append(
-                PairPref(
-                    student_id_a=str(r["StudentID_A"]).strip(),
-                    student_id_b=str(r["StudentID_B"]).strip(),
-                    course_id=str(r["CourseID"]).strip(),
-                    position=int(r["Position"]),
-                    score=score,
-                )
-            )
-    return rows
+# Output CSVs are written in one go, so a large buffer keeps write syscalls few.
+_WRITE_BUFFER_SIZE = 1 << 20
+# Input CSVs are parsed in blocks of this many rows to bound peak memory.
+_READ_BLOCK_ROWS = 1 << 16
+
+
+def _iter_csv_blocks(
+    path: StrPath,
+    *,
+    required: set[str],
+    label: str,
+    block_rows: int = _READ_BLOCK_ROWS,
+) -> Iterator[tuple[dict[str, int], list[list[str]]]]:
+    """
+    Stream a CSV as blocks of raw rows, each paired with the header -> column index map.
+
+    Rows are plain lists so callers can slice whole columns with `itemgetter` (no per-row
+    dict as with `csv.DictReader`). Only one block of raw rows is alive at a time, so peak
+    memory stays near the parsed columns instead of columns + every raw row. Blank lines
+    are skipped.
+    """
+
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None or not required.issubset(header):
+            raise ValueError(f"{label} need to include rows: {sorted(required)} (file: {path})")
+        index = {name: i for i, name in enumerate(header)}
+        width = max(index[name] for name in required) + 1
+        row_no = 0
+        while True:
+            raw = list(islice(reader, block_rows))
+            if not raw:
+                return
+            block = list(filter(None, raw))
+            if block and min(map(len, block)) < width:
+                short = next(i for i, r in enumerate(block, start=row_no + 1) if len(r) < width)
+                raise ValueError(f"{label} row has too few columns (file: {path}, data row {short})")
+            row_no += len(block)
+            yield index, block
 
 
-def _read_table_lambda(path: Path) -> list[StudentLambda]:
+def _id_column(rows: list[list[str]], index: int) -> Iterator[str]:
+    """
+    Yield a stripped, interned ID column.
+
+    Interning makes every occurrence of an ID the same object across tables, so the engine's
+    tuple-keyed dicts hit the identity fast path instead of comparing string contents.
+    """
+
+    return map(sys.intern, map(str.strip, map(itemgetter(index), rows)))
+
+
+def _int_column(rows: list[list[str]], index: int) -> Iterator[int]:
+    return map(int, map(itemgetter(index), rows))
+
+
+def _optional_int_column(rows: list[list[str]], index: int | None) -> list[int | None]:
+    """
+    Parse an optional int column: a missing column, empty cell or short row gives None.
+
+    Fully populated blocks (the common case) convert the whole column with one `map(int)`;
+    only blocks with gaps fall back to per-cell handling.
+    """
+
+    if index is None:
+        return [None] * len(rows)
+    if min(map(len, rows), default=0) > index:
+        try:
+            return list(map(int, map(itemgetter(index), rows)))
+        except ValueError:
+            pass
+    return [
+        (int(raw) if raw else None)
+        for raw in (r[index].strip() if len(r) > index else "" for r in rows)
+    ]
+
+
+def _read_table_1(path: StrPath) -> IndividualPrefColumns:
+    """Read Table 1 CSV (individual preferences) directly into columnar form."""
+
+    student_ids: list[str] = []
+    course_ids: list[str] = []
+    scores = array("q")
+    positions = array("q")
+    for index, rows in _iter_csv_blocks(
+        path, required={"StudentID", "CourseID", "Score", "Position"}, label="CSV A"
+    ):
+        student_ids.extend(_id_column(rows, index["StudentID"]))
+        course_ids.extend(_id_column(rows, index["CourseID"]))
+        scores.extend(_int_column(rows, index["Score"]))
+        positions.extend(_int_column(rows, index["Position"]))
+    return IndividualPrefColumns(
+        student_ids=tuple(student_ids),
+        course_ids=tuple(course_ids),
+        scores=scores,
+        positions=positions,
+    )
+
+
+def _read_table_2(path: StrPath) -> PairPrefColumns:
+    """Read Table 2 CSV (pair preferences) directly into columnar form."""
+
+    student_ids_a: list[str] = []
+    student_ids_b: list[str] = []
+    course_ids: list[str] = []
+    positions = array("q")
+    scores: list[int | None] = []
+    for index, rows in _iter_csv_blocks(
+        path, required={"StudentID_A", "StudentID_B", "CourseID", "Position"}, label="CSV B"
+    ):
+        student_ids_a.extend(_id_column(rows, index["StudentID_A"]))
+        student_ids_b.extend(_id_column(rows, index["StudentID_B"]))
+        course_ids.extend(_id_column(rows, index["CourseID"]))
+        positions.extend(_int_column(rows, index["Position"]))
+        scores.extend(_optional_int_column(rows, index.get("Score")))
+    return PairPrefColumns(
+        student_ids_a=tuple(student_ids_a),
+        student_ids_b=tuple(student_ids_b),
+        course_ids=tuple(course_ids),
+        positions=positions,
+        scores=tuple(scores),
+    )
+
+
+def _read_table_lambda(path: StrPath) -> tuple[StudentLambda, ...]:
     """Read per-student lambda CSV into strongly-typed records."""
 
-    rows: list[StudentLambda] = []
-    with path.open(newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        required = {"StudentID", "LambdaFriend"}
-        if reader.fieldnames is None or not required.issubset(set(reader.fieldnames)):
-            raise ValueError(f"CSV Lambda needs rows: {sorted(required)} (file: {path})")
-        for r in reader:
-            rows.append(
-                StudentLambda(
-                    student_id=str(r["StudentID"]).strip(),
-                    lambda_friend=float(r["LambdaFriend"]),
-                )
+    rows_out: list[StudentLambda] = []
+    for index, rows in _iter_csv_blocks(
+        path, required={"StudentID", "LambdaFriend"}, label="CSV Lambda"
+    ):
+        student_index = index["StudentID"]
+        lambda_index = index["LambdaFriend"]
+        rows_out.extend(
+            StudentLambda(
+                student_id=sys.intern(r[student_index].strip()),
+                lambda_friend=float(r[lambda_index]),
             )
-    return rows
+            for r in rows
+        )
+    return tuple(rows_out)
 
 
 def _write_allocation_csv(
@@ -90,29 +175,50 @@ def _write_allocation_csv(
     Write draft-only allocation log (round picks only).
     """
 
-    with path.open("w", newline="", encoding="utf-8") as f:
+    with path.open("w", newline="", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE) as f:
         writer = csv.writer(f)
         writer.writerow(["RoundPicked", "StudentID", "CourseID"])
-        for row in pick_log:
-            writer.writerow(
-                [
-                    row.round_picked,
-                    row.student_id,
-                    row.course_id,
-                ]
-            )
+        writer.writerows((row.round_picked, row.student_id, row.course_id) for row in pick_log)
+
+
+def _post_alloc_csv_row(
+    iteration: int,
+    event_type: str,
+    student_id: str | None,
+    dropped_courses: tuple[str, ...] | None,
+    added_courses: tuple[str, ...] | None,
+    swap_student_1: str | None,
+    swap_course_1: str | None,
+    swap_student_2: str | None,
+    swap_course_2: str | None,
+    delta_utility: float | None,
+) -> tuple[object, ...]:
+    """Format one post-allocation event as a CSV row (None and empty lists become "")."""
+
+    return (
+        iteration,
+        event_type,
+        (student_id or ""),
+        ("" if not dropped_courses else ";".join(dropped_courses)),
+        ("" if not added_courses else ";".join(added_courses)),
+        (swap_student_1 or ""),
+        (swap_course_1 or ""),
+        (swap_student_2 or ""),
+        (swap_course_2 or ""),
+        (f"{delta_utility:.12f}" if delta_utility is not None else ""),
+    )
 
 
 def _write_post_alloc_csv(
     path: Path,
     *,
-    post_log: list[PostAllocLogRow],
+    post_log: PostAllocLog,
 ) -> None:
     """
     Write post-allocation events (swap or add/drop) to a separate CSV.
     """
 
-    with path.open("w", newline="", encoding="utf-8") as f:
+    with path.open("w", newline="", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE) as f:
         writer = csv.writer(f)
         writer.writerow(
             [
@@ -128,23 +234,21 @@ def _write_post_alloc_csv(
                 "DeltaUtility",
             ]
         )
-        for row in post_log:
-            dropped = "" if not row.dropped_courses else ";".join(row.dropped_courses)
-            added = "" if not row.added_courses else ";".join(row.added_courses)
-            writer.writerow(
-                [
-                    row.iteration,
-                    row.event_type,
-                    (row.student_id or ""),
-                    dropped,
-                    added,
-                    (row.swap_student_1 or ""),
-                    (row.swap_course_1 or ""),
-                    (row.swap_student_2 or ""),
-                    (row.swap_course_2 or ""),
-                    (f"{row.delta_utility:.12f}" if row.delta_utility is not None else ""),
-                ]
+        writer.writerows(
+            map(
+                _post_alloc_csv_row,
+                post_log.iterations,
+                post_log.event_types,
+                post_log.student_ids,
+                post_log.dropped_courses,
+                post_log.added_courses,
+                post_log.swap_students_1,
+                post_log.swap_courses_1,
+                post_log.swap_students_2,
+                post_log.swap_courses_2,
+                post_log.delta_utilities,
             )
+        )
 
 
 def _write_summary_csv(
@@ -161,7 +265,7 @@ def _write_summary_csv(
     Write a one-row summary CSV.
     """
 
-    with path.open("w", newline="", encoding="utf-8") as f:
+    with path.open("w", newline="", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE) as f:
         writer = csv.writer(f)
         writer.writerow(
             [
@@ -199,7 +303,7 @@ def _write_metrics_extended_csv(
     """
 
     keys = list(metrics.values.keys())
-    with path.open("w", newline="", encoding="utf-8") as f:
+    with path.open("w", newline="", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE) as f:
         writer = csv.writer(f)
         writer.writerow(keys)
         writer.writerow([f"{metrics.values[k]:.6f}" for k in keys])
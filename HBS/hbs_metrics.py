@@ -1,9 +1,17 @@
 from __future__ import annotations
 
 import math
+from itertools import repeat
+from operator import mul
 from typing import Sequence
 
 
+def _clamped(values: Sequence[float]) -> list[float]:
+    """Float copy of values with negatives (and NaN) clamped to 0.0."""
+
+    return [v if v > 0.0 else 0.0 for v in map(float, values)]
+
+
 def compute_total_utility(per_student_utilities: Sequence[float]) -> float:
     return float(sum(per_student_utilities))
 
@@ -17,7 +25,7 @@ def compute_gini_index(per_student_utilities: Sequence[float]) -> float:
       G = 0                                     if X == 0
     """
 
-    values = [max(0.0, float(v)) for v in per_student_utilities]
+    values = _clamped(per_student_utilities)
     n = len(values)
     if n == 0:
         return 0.0
@@ -27,18 +35,17 @@ def compute_gini_index(per_student_utilities: Sequence[float]) -> float:
     if total <= 0.0:
         return 0.0
 
-    numerator = 0.0
-    for i, x in enumerate(values, start=1):
-        numerator += (2 * i - n - 1) * x
+    # Weights (2i - n - 1) for i = 1..n are the odd-stepped range 1-n, 3-n, ..., n-1.
+    numerator = sum(map(mul, range(1 - n, n, 2), values))
     return numerator / (n * total)
 
 
 def compute_jain_index(values: Sequence[float]) -> float:
-    vals = [max(0.0, float(v)) for v in values]
+    vals = _clamped(values)
     total = sum(vals)
     if total <= 0.0:
         return 0.0
-    denom = sum(v * v for v in vals)
+    denom = sum(map(mul, vals, vals))
     if denom <= 0.0:
         return 0.0
     n = len(vals)
@@ -46,24 +53,21 @@ def compute_jain_index(values: Sequence[float]) -> float:
 
 
 def compute_theil_index(values: Sequence[float]) -> float:
-    vals = [max(0.0, float(v)) for v in values]
+    vals = _clamped(values)
     n = len(vals)
     if n == 0:
         return 0.0
     mean = sum(vals) / n
     if mean <= 0.0:
         return 0.0
-    total = 0.0
-    for v in vals:
-        if v <= 0.0:
-            continue
-        ratio = v / mean
-        total += ratio * (0.0 if ratio <= 0.0 else math.log(ratio))
+    log = math.log
+    ratios = [v / mean for v in vals if v > 0.0]
+    total = sum(r * log(r) for r in ratios)
     return total / n
 
 
 def compute_atkinson_index(values: Sequence[float], *, epsilon: float = 0.5) -> float:
-    vals = [max(0.0, float(v)) for v in values]
+    vals = _clamped(values)
     n = len(vals)
     if n == 0:
         return 0.0
@@ -80,7 +84,7 @@ def compute_atkinson_index(values: Sequence[float], *, epsilon: float = 0.5) ->
     if epsilon < 0.0:
         raise ValueError("epsilon must be >= 0")
     power = 1.0 - epsilon
-    mean_power = sum((v ** power) for v in vals) / n
+    mean_power = sum(map(pow, vals, repeat(power, n))) / n
     if mean_power <= 0.0:
         return 0.0
     eq = mean_power ** (1.0 / power)
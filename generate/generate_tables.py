@@ -4,21 +4,28 @@ from __future__ import annotations
 import argparse
 import csv
 import random
+from bisect import bisect
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import accumulate, repeat
+from operator import attrgetter
 from pathlib import Path
-from typing import Sequence
+from typing import NamedTuple, Sequence
 
+# Крупный буфер записи: строки таблиц уходят на диск блоками, а не мелкими write().
+_WRITE_BUFFER_SIZE = 1 << 20
 
-@dataclass(frozen=True)
-class Table1Row:
+
+# Строки Таблиц 1 и 2 — NamedTuple: создаются дешевле frozen dataclass, а порядок полей
+# совпадает с колонками CSV, поэтому writerows пишет их как есть.
+class Table1Row(NamedTuple):
     student_id: str
     course_id: str
     score: int
     position: int
 
 
-@dataclass(frozen=True)
-class Table2Row:
+class Table2Row(NamedTuple):
     student_id_a: str
     student_id_b: str
     course_id: str
@@ -63,16 +70,32 @@ def _soft_score_weights(score_min: int, score_max: int) -> list[int]:
     return [max(1, w) for w in weights]
 
 
+@lru_cache(maxsize=None)
+def _score_distribution(score_min: int, score_max: int) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    """
+    Значения шкалы и накопленные "мягкие" веса (CDF) для выборки Score.
+    Считается один раз на шкалу, а не на каждый вызов _generate_scores.
+    """
+    values = tuple(range(score_min, score_max + 1))
+    return values, tuple(accumulate(_soft_score_weights(score_min, score_max)))
+
+
 def _generate_scores(
     rng: random.Random,
     count: int,
-    *,
-    score_min: int,
-    score_max: int,
+    distribution: tuple[tuple[int, ...], tuple[int, ...]],
 ) -> list[int]:
-    values = list(range(score_min, score_max + 1))
-    weights = _soft_score_weights(score_min, score_max)
-    return [rng.choices(values, weights=weights, k=1)[0] for _ in range(count)]
+    """
+    count значений Score по накопленным весам.
+    distribution — результат _score_distribution, вычисляется один раз на таблицу.
+    """
+    values, cum_weights = distribution
+    # То же, что rng.choices(values, cum_weights=cum_weights, k=count): один rng.random()
+    # на значение и bisect (правый) по CDF, но без разбора аргументов choices на каждый вызов.
+    rng_random = rng.random
+    total = cum_weights[-1] + 0.0
+    hi = len(values) - 1
+    return [values[bisect(cum_weights, rng_random() * total, 0, hi)] for _ in repeat(None, count)]
 
 
 def _rank_positions(
@@ -88,17 +111,19 @@ def _rank_positions(
     Тай-брейк: небольшой шум.
     Опционально (Способ B): с вероятностью swap_prob делаем swap соседей.
     """
-    noise = [rng.random() * 0.01 for _ in scores]
-    ranked_indices = sorted(
-        range(len(scores)),
-        key=lambda i: (scores[i], noise[i]),
-        reverse=True,
-    )
+    rng_random = rng.random
+    # Ключи (score, шум) собираем одним проходом: sorted берёт их через list.__getitem__
+    # без вызова lambda на элемент.
+    sort_keys = [(score, rng_random() * 0.01) for score in scores]
+    ranked_indices = sorted(range(len(scores)), key=sort_keys.__getitem__, reverse=True)
 
     if swap_prob > 0:
+        # Число случайных значений зависит от исхода (после swap сосед пропускается без draw),
+        # поэтому их нельзя заранее вытянуть блоком без сдвига seeded-потока.
         i = 0
-        while i < len(ranked_indices) - 1:
-            if rng.random() < swap_prob:
+        last = len(ranked_indices) - 1
+        while i < last:
+            if rng_random() < swap_prob:
                 ranked_indices[i], ranked_indices[i + 1] = (
                     ranked_indices[i + 1],
                     ranked_indices[i],
@@ -123,23 +148,12 @@ def generate_table_1(
     swap_prob: float,
 ) -> list[Table1Row]:
     rows: list[Table1Row] = []
+    distribution = _score_distribution(score_min, score_max)
+    n_courses = len(course_ids)
     for student_id in student_ids:
-        scores = _generate_scores(
-            rng,
-            len(course_ids),
-            score_min=score_min,
-            score_max=score_max,
-        )
+        scores = _generate_scores(rng, n_courses, distribution)
         positions = _rank_positions(rng, scores, swap_prob=swap_prob)
-        for course_id, score, position in zip(course_ids, scores, positions):
-            rows.append(
-                Table1Row(
-                    student_id=student_id,
-                    course_id=course_id,
-                    score=score,
-                    position=position,
-                )
-            )
+        rows.extend(map(Table1Row, repeat(student_id), course_ids, scores, positions))
     return rows
 
 
@@ -166,44 +180,34 @@ def generate_table_2(
       - Score в диапазоне [score_min, score_max].
     """
     rows: list[Table2Row] = []
+    distribution = _score_distribution(score_min, score_max)
+    # Кандидаты для StudentID_A — все остальные студенты. Вместо списка длины N на каждую пару
+    # (course, A) выбираем индексы из range(N - 1) и сдвигаем те, что >= индекса A:
+    # sample тратит те же случайные числа, что и на списке кандидатов, и выбирает те же элементы.
+    n_candidates = len(student_ids) - 1
     for course_id in course_ids:
-        for student_id_a in student_ids:
-            candidates = [b for b in student_ids if b != student_id_a]
-            if not candidates or top_k <= 0:
+        for index_a, student_id_a in enumerate(student_ids):
+            if n_candidates <= 0 or top_k <= 0:
                 continue
-            k = min(top_k, len(candidates))
-            chosen = rng.sample(candidates, k=k)
+            k = min(top_k, n_candidates)
+            chosen = [
+                student_ids[j + 1 if j >= index_a else j]
+                for j in rng.sample(range(n_candidates), k=k)
+            ]
 
             if score_mode == "score_first":
-                scores = _generate_scores(
-                    rng,
-                    k,
-                    score_min=score_min,
-                    score_max=score_max,
-                )
+                scores = _generate_scores(rng, k, distribution)
                 positions = _rank_positions(rng, scores, swap_prob=swap_prob)
             elif score_mode == "position_first":
-                scores = _generate_scores(
-                    rng,
-                    k,
-                    score_min=score_min,
-                    score_max=score_max,
-                )
+                scores = _generate_scores(rng, k, distribution)
                 scores = sorted(scores, reverse=True)
                 positions = list(range(1, k + 1))
             else:
                 raise ValueError(f"Unknown score_mode: {score_mode}")
 
-            for student_id_b, score, position in zip(chosen, scores, positions):
-                rows.append(
-                    Table2Row(
-                        student_id_a=student_id_a,
-                        student_id_b=student_id_b,
-                        course_id=course_id,
-                        position=position,
-                        score=score,
-                    )
-                )
+            rows.extend(
+                map(Table2Row, repeat(student_id_a), chosen, repeat(course_id), positions, scores)
+            )
     return rows
 
 
@@ -228,21 +232,36 @@ def _validate_table_1(
     score_min: int,
     score_max: int,
 ) -> None:
-    seen: set[tuple[str, str]] = set()
-    positions_by_student: dict[str, set[int]] = {}
-    for r in rows:
+    # Строки, отсортированные по (StudentID, CourseID): дубликаты ключа оказываются соседними,
+    # а позиции студента собираются в битовую маску и сверяются с полной маской 1..n_courses
+    # на границе группы — без словаря множеств по студентам.
+    full_mask = (1 << n_courses) - 1
+
+    def check_positions(student_id: str, mask: int) -> None:
+        if mask != full_mask:
+            positions = [i + 1 for i in range(n_courses) if mask >> i & 1]
+            raise ValueError(f"Table1 positions invalid for {student_id}: {positions}")
+
+    student_id: str | None = None
+    course_id: str | None = None
+    mask = 0
+    for r in sorted(rows, key=attrgetter("student_id", "course_id")):
         key = (r.student_id, r.course_id)
-        if key in seen:
+        if r.student_id != student_id:
+            if student_id is not None:
+                check_positions(student_id, mask)
+            student_id = r.student_id
+            mask = 0
+        elif r.course_id == course_id:
             raise ValueError(f"Table1 duplicate key: {key}")
-        seen.add(key)
+        course_id = r.course_id
         if not (score_min <= r.score <= score_max):
             raise ValueError(f"Table1 score out of range: {r.score} for {key}")
-        positions_by_student.setdefault(r.student_id, set()).add(r.position)
-
-    expected_positions = set(range(1, n_courses + 1))
-    for student_id, positions in positions_by_student.items():
-        if positions != expected_positions:
-            raise ValueError(f"Table1 positions invalid for {student_id}: {sorted(positions)}")
+        if not (1 <= r.position <= n_courses):
+            raise ValueError(f"Table1 position out of range: {r.position} for {key}")
+        mask |= 1 << (r.position - 1)
+    if student_id is not None:
+        check_positions(student_id, mask)
 
 
 def _validate_table_2(
@@ -252,64 +271,54 @@ def _validate_table_2(
     score_min: int,
     score_max: int,
 ) -> None:
-    seen: set[tuple[str, str, str]] = set()
-    group_counts: dict[tuple[str, str], int] = {}
-    positions_by_group: dict[tuple[str, str], set[int]] = {}
-    friends_by_group: dict[tuple[str, str], set[str]] = {}
-
-    for r in rows:
+    # Один проход по строкам, отсортированным по (StudentID_A, CourseID, Position): группа
+    # (A, course) идет подряд, поэтому хватает счетчика позиций и маленького множества друзей,
+    # которые сбрасываются на границе группы. Дубликат ключа (A, B, course) — это повтор B в группе.
+    group: tuple[str, str] | None = None
+    expected_position = 1
+    friends: set[str] = set()
+    for r in sorted(rows, key=attrgetter("student_id_a", "course_id", "position")):
         if r.student_id_a == r.student_id_b:
             raise ValueError(f"Table2 self-pair found: {r.student_id_a}")
         key = (r.student_id_a, r.student_id_b, r.course_id)
-        if key in seen:
-            raise ValueError(f"Table2 duplicate key: {key}")
-        seen.add(key)
         if not (1 <= r.position <= top_k):
             raise ValueError(f"Table2 position out of range: {r.position} for {key}")
         if not (score_min <= r.score <= score_max):
             raise ValueError(f"Table2 score out of range: {r.score} for {key}")
 
-        group = (r.student_id_a, r.course_id)
-        group_counts[group] = group_counts.get(group, 0) + 1
-        positions_by_group.setdefault(group, set()).add(r.position)
-        friends_by_group.setdefault(group, set()).add(r.student_id_b)
-
-    for group, count in group_counts.items():
-        positions = positions_by_group.get(group, set())
-        friends = friends_by_group.get(group, set())
-        if count != len(positions):
+        if (r.student_id_a, r.course_id) != group:
+            group = (r.student_id_a, r.course_id)
+            expected_position = 1
+            friends.clear()
+        if r.student_id_b in friends:
+            raise ValueError(f"Table2 duplicate key: {key}")
+        friends.add(r.student_id_b)
+        if r.position < expected_position:
             raise ValueError(f"Table2 duplicate positions in group: {group}")
-        if count != len(friends):
-            raise ValueError(f"Table2 duplicate friends in group: {group}")
-        if positions:
-            max_pos = max(positions)
-            expected = set(range(1, max_pos + 1))
-            if positions != expected:
-                raise ValueError(f"Table2 positions not contiguous in group: {group}")
+        if r.position != expected_position:
+            raise ValueError(f"Table2 positions not contiguous in group: {group}")
+        expected_position += 1
 
 
 def _write_csv_table_1(path: Path, rows: Sequence[Table1Row]) -> None:
-    with path.open("w", newline="", encoding="utf-8") as f:
+    with path.open("w", newline="", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE) as f:
         writer = csv.writer(f)
         writer.writerow(["StudentID", "CourseID", "Score", "Position"])
-        for r in rows:
-            writer.writerow([r.student_id, r.course_id, r.score, r.position])
+        writer.writerows(rows)
 
 
 def _write_csv_table_2(path: Path, rows: Sequence[Table2Row]) -> None:
-    with path.open("w", newline="", encoding="utf-8") as f:
+    with path.open("w", newline="", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE) as f:
         writer = csv.writer(f)
         writer.writerow(["StudentID_A", "StudentID_B", "CourseID", "Position", "Score"])
-        for r in rows:
-            writer.writerow([r.student_id_a, r.student_id_b, r.course_id, r.position, r.score])
+        writer.writerows(rows)
 
 
 def _write_csv_table_3(path: Path, rows: Sequence[Table3Row]) -> None:
-    with path.open("w", newline="", encoding="utf-8") as f:
+    with path.open("w", newline="", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE) as f:
         writer = csv.writer(f)
         writer.writerow(["StudentID", "LambdaFriend"])
-        for r in rows:
-            writer.writerow([r.student_id, f"{r.lambda_friend:.3f}"])
+        writer.writerows((r.student_id, f"{r.lambda_friend:.3f}") for r in rows)
 
 
 def _parse_args() -> argparse.Namespace:
@@ -386,6 +395,11 @@ def _parse_args() -> argparse.Namespace:
         default=Path("tables/table3_lambda.csv"),
         help="Путь для CSV Таблицы 3 (lambda)",
     )
+    p.add_argument(
+        "--no-validate",
+        action="store_true",
+        help="Не проверять сгенерированные Таблицы 1 и 2 (быстрее на больших N и K)",
+    )
     return p.parse_args()
 
 
@@ -410,8 +424,10 @@ def main() -> int:
     if not (0.0 <= args.friend_swap_prob <= 1.0):
         raise SystemExit("--friend-swap-prob должен быть в диапазоне 0..1")
 
-    student_ids = [f"S{i}" for i in range(1, n_students + 1)]
-    course_ids = [f"C{i}" for i in range(1, n_courses + 1)]
+    # Каждый ID создается один раз: все строки таблиц ссылаются на эти же объекты, поэтому
+    # сравнения и хеширование ID в генераторе и валидаторах обходятся без копий.
+    student_ids = tuple(f"S{i}" for i in range(1, n_students + 1))
+    course_ids = tuple(f"C{i}" for i in range(1, n_courses + 1))
 
     rng = random.Random(args.seed)
 
@@ -438,18 +454,19 @@ def main() -> int:
         lambda_default=args.lambda_default,
     )
 
-    _validate_table_1(
-        table1,
-        n_courses=len(course_ids),
-        score_min=args.score_min,
-        score_max=args.score_max,
-    )
-    _validate_table_2(
-        table2,
-        top_k=args.friend_top_k,
-        score_min=friend_score_min,
-        score_max=friend_score_max,
-    )
+    if not args.no_validate:
+        _validate_table_1(
+            table1,
+            n_courses=len(course_ids),
+            score_min=args.score_min,
+            score_max=args.score_max,
+        )
+        _validate_table_2(
+            table2,
+            top_k=args.friend_top_k,
+            score_min=friend_score_min,
+            score_max=friend_score_max,
+        )
 
     _write_csv_table_1(args.out1, table1)
     _write_csv_table_2(args.out2, table2)
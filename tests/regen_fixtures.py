@@ -0,0 +1,28 @@
+"""
+Regenerate the golden outputs checked by tests/test_reproducibility.py.
+
+Run after an intended change to the allocation or the output format:
+
+    python tests/regen_fixtures.py
+"""
+
+from test_reproducibility import (
+    FIXTURE_DIR,
+    GOLDEN_ALLOCATION,
+    GOLDEN_SUMMARY,
+    _render_outputs,
+    _run_fixture,
+)
+
+
+def main() -> int:
+    allocation, summary = _render_outputs(_run_fixture())
+    FIXTURE_DIR.mkdir(exist_ok=True)
+    GOLDEN_ALLOCATION.write_text(allocation, encoding="utf-8")
+    GOLDEN_SUMMARY.write_text(summary, encoding="utf-8")
+    print(f"Wrote {GOLDEN_ALLOCATION} and {GOLDEN_SUMMARY}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
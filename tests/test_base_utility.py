@@ -5,10 +5,17 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from HBS.hbs_config import _RunConfig
-from HBS.hbs_domain import IndividualPref, PairPref
+from HBS.hbs_domain import IndividualPref, IndividualPrefColumns, PairPref
 from HBS.hbs_engine import _HbsSocialDraftEngine, _pos_u
 
 
+# One student ranking two courses; shared read-only by the table-backed tests.
+_TWO_COURSE_PREFS = (
+    IndividualPref(student_id="S1", course_id="C1", score=10, position=1),
+    IndividualPref(student_id="S1", course_id="C2", score=5, position=2),
+)
+
+
 def _make_engine(
     *,
     individual_prefs: list[IndividualPref],
@@ -46,15 +53,21 @@ class TestBaseUtility(unittest.TestCase):
         self.assertAlmostEqual(_pos_u(2, 1), 0.0, places=9)
 
     def test_base_utility_from_table(self) -> None:
-        prefs = [
-            IndividualPref(student_id="S1", course_id="C1", score=10, position=1),
-            IndividualPref(student_id="S1", course_id="C2", score=5, position=2),
-        ]
-        engine = _make_engine(individual_prefs=prefs, pair_prefs=[])
+        engine = _make_engine(individual_prefs=_TWO_COURSE_PREFS, pair_prefs=())
         self.assertAlmostEqual(engine._base_utility("S1", "C1"), 1.0, places=9)
         self.assertAlmostEqual(engine._base_utility("S1", "C2"), 0.0, places=9)
         self.assertAlmostEqual(engine._base_utility("S1", "C3"), 0.0, places=9)
 
+    def test_columnar_prefs_match_rows(self) -> None:
+        columns = IndividualPrefColumns.from_rows(_TWO_COURSE_PREFS)
+        self.assertEqual(len(columns), 2)
+        self.assertEqual(list(columns.positions), [1, 2])
+
+        engine = _make_engine(individual_prefs=columns, pair_prefs=[])
+        self.assertAlmostEqual(engine._base_utility("S1", "C1"), 1.0, places=9)
+        self.assertEqual(engine._score_a("S1", "C2"), 5)
+        self.assertEqual(engine._position_a("S1", "C3"), engine._MISSING_POSITION)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -65,6 +65,33 @@ class TestFriendBonus(unittest.TestCase):
         self.assertAlmostEqual(friend_bonus, 1.0, places=9)
         self.assertAlmostEqual(total, 1.0, places=9)
 
+    def test_swap_delta_counts_s2_overlap_when_s1_lambda_is_zero(self) -> None:
+        prefs = [
+            IndividualPref(student_id=s, course_id=c, score=10, position=1)
+            for s in ("S1", "S2", "S3")
+            for c in ("C1", "C2")
+        ]
+        pair_prefs = [
+            PairPref(student_id_a="S2", student_id_b="S3", course_id="C1", position=1, score=5)
+        ]
+        engine = _make_engine(
+            individual_prefs=prefs,
+            pair_prefs=pair_prefs,
+            student_lambdas={"S1": 0.0, "S2": 1.0, "S3": 1.0},
+        )
+        for student_id, course_id in (("S1", "C1"), ("S2", "C2"), ("S3", "C1")):
+            engine._alloc_set[student_id].add(course_id)
+            engine._alloc_list[student_id].append(course_id)
+            engine._alloc_sorted[student_id].append(course_id)
+
+        before = engine._global_welfare()
+        delta = engine._swap_delta("S1", "C1", "S2", "C2")
+        engine._swap_courses("S1", "C1", "S2", "C2")
+        after = engine._global_welfare()
+
+        self.assertAlmostEqual(delta, after - before, places=9)
+        self.assertAlmostEqual(delta, 1.0, places=9)
+
 
 if __name__ == "__main__":
     unittest.main()
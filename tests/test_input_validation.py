@@ -1,3 +1,4 @@
+import math
 import sys
 import unittest
 from pathlib import Path
@@ -5,7 +6,8 @@ from tempfile import TemporaryDirectory
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from HBS.hbs_api import run_hbs_social
+from HBS.hbs_api import _build_config, run_hbs_social, run_hbs_social_rows
+from HBS.hbs_domain import ExtendedMetrics, IndividualPref
 
 
 def _write_table_1(path: Path) -> None:
@@ -69,6 +71,53 @@ class TestInputValidation(unittest.TestCase):
                     improve_mode="swap",
                 )
 
+    def test_skip_empty_run_does_not_read_inputs(self) -> None:
+        with TemporaryDirectory() as tmp:
+            workdir = Path(tmp)
+            result = run_hbs_social(
+                workdir / "missing_a.csv",
+                workdir / "missing_b.csv",
+                cap_default=1,
+                b=1,
+                seed=1,
+                draft_rounds=0,
+                post_iters=0,
+                skip_empty=True,
+            )
+        self.assertEqual(result.alloc, {})
+        self.assertEqual(result.pick_log, [])
+        self.assertEqual(len(result.post_log), 0)
+        self.assertEqual(list(result.summary.record), [0.0, 0.0, 0.0, 0.0, 1.0, 1.0])
+        record = result.metrics_extended.record
+        self.assertEqual(len(record), len(ExtendedMetrics.RECORD_FIELDS))
+        self.assertTrue(all(math.isnan(value) for value in record))
+
+    def test_extended_metrics_record_follows_record_fields(self) -> None:
+        result = run_hbs_social_rows(
+            [IndividualPref(student_id="S1", course_id="C1", score=5, position=1)],
+            [],
+            cap_default=1,
+            b=1,
+            seed=1,
+        )
+        metrics = result.metrics_extended
+        self.assertEqual(tuple(metrics.values), ExtendedMetrics.RECORD_FIELDS)
+        self.assertEqual(list(metrics.record), list(metrics.values.values()))
+
+    def test_build_config_cache_keeps_argument_types_apart(self) -> None:
+        params = dict(
+            b=1,
+            seed=1,
+            draft_rounds=None,
+            post_iters=0,
+            improve_mode="swap",
+            progress=False,
+            sanity_checks=False,
+            delta_check_every=0,
+        )
+        self.assertIs(type(_build_config(cap_default=2, **params).default_capacity), int)
+        self.assertIs(type(_build_config(cap_default=2.0, **params).default_capacity), float)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -6,88 +6,152 @@ from tempfile import TemporaryDirectory
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from HBS.hbs_api import run_hbs_social
-from HBS.hbs_io import (
-    _write_allocation_csv,
-    _write_post_alloc_csv,
-    _write_summary_csv,
+from HBS.hbs_api import run_hbs_social, run_hbs_social_rows
+from HBS.hbs_domain import IndividualPref, PairPref, RunResult, RunSummary
+from HBS.hbs_io import _read_table_1, _read_table_2, _write_allocation_csv, _write_summary_csv
+
+
+# Tables 1 and 2 as CSV-ordered rows: written to disk for the CSV-path tests, or turned into
+# domain rows directly for the in-memory runs.
+_TABLE_1_ROWS = (
+    ("S1", "C1", 5, 1),
+    ("S1", "C2", 1, 2),
+    ("S2", "C1", 1, 2),
+    ("S2", "C2", 5, 1),
+    ("S3", "C1", 4, 1),
+    ("S3", "C2", 2, 2),
+)
+_TABLE_2_ROWS = (
+    ("S1", "S2", "C1", 1, 5),
+    ("S1", "S2", "C2", 1, 5),
+    ("S2", "S3", "C1", 1, 5),
+    ("S2", "S3", "C2", 1, 5),
+    ("S3", "S1", "C1", 1, 5),
+    ("S3", "S1", "C2", 1, 5),
 )
 
 
 def _write_table_1(path: Path) -> None:
-    rows = [
-        ("S1", "C1", 5, 1),
-        ("S1", "C2", 1, 2),
-        ("S2", "C1", 1, 2),
-        ("S2", "C2", 5, 1),
-        ("S3", "C1", 4, 1),
-        ("S3", "C2", 2, 2),
-    ]
     with path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
+        writer = csv.writer(f, lineterminator="\n")
         writer.writerow(["StudentID", "CourseID", "Score", "Position"])
-        writer.writerows(rows)
+        writer.writerows(_TABLE_1_ROWS)
 
 
 def _write_table_2(path: Path) -> None:
-    rows = [
-        ("S1", "S2", "C1", 1, 5),
-        ("S1", "S2", "C2", 1, 5),
-        ("S2", "S3", "C1", 1, 5),
-        ("S2", "S3", "C2", 1, 5),
-        ("S3", "S1", "C1", 1, 5),
-        ("S3", "S1", "C2", 1, 5),
-    ]
     with path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
+        writer = csv.writer(f, lineterminator="\n")
         writer.writerow(["StudentID_A", "StudentID_B", "CourseID", "Position", "Score"])
-        writer.writerows(rows)
-
-
-def _run_once(workdir: Path) -> tuple[str, str]:
-    csv_a = workdir / "table1.csv"
-    csv_b = workdir / "table2.csv"
-    allocation = workdir / "allocation.csv"
-    post_alloc = workdir / "post_allocation.csv"
-    summary = workdir / "summary.csv"
-
-    _write_table_1(csv_a)
-    _write_table_2(csv_b)
-
-    result = run_hbs_social(
-        csv_a,
-        csv_b,
-        cap_default=2,
-        b=2,
-        draft_rounds=2,
-        post_iters=1,
-        improve_mode="add-drop",
-        seed=42,
-    )
+        writer.writerows(_TABLE_2_ROWS)
+
+
+# Golden outputs of the seed-42 fixture run; regenerate with tests/regen_fixtures.py after an
+# intended change to the allocation or the output format.
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures"
+GOLDEN_ALLOCATION = FIXTURE_DIR / "allocation_seed42.csv"
+GOLDEN_SUMMARY = FIXTURE_DIR / "summary_seed42.csv"
+
+_FIXTURE_PARAMS = dict(
+    cap_default=2,
+    b=2,
+    draft_rounds=2,
+    post_iters=1,
+    improve_mode="add-drop",
+    seed=42,
+)
 
-    _write_allocation_csv(allocation, pick_log=result.pick_log)
-    _write_post_alloc_csv(post_alloc, post_log=result.post_log)
-    _write_summary_csv(
-        summary,
-        seed=42,
-        cap_default=2,
-        b=2,
-        draft_rounds=2,
-        post_iters=1,
-        summary=result.summary,
+
+def _run_fixture() -> RunResult:
+    return run_hbs_social_rows(
+        [IndividualPref(*row) for row in _TABLE_1_ROWS],
+        [PairPref(*row) for row in _TABLE_2_ROWS],
+        **_FIXTURE_PARAMS,
     )
 
-    return allocation.read_text(encoding="utf-8"), summary.read_text(encoding="utf-8")
+
+def _render_outputs(result: RunResult) -> tuple[str, str]:
+    """Render the allocation and summary CSVs of a fixture run as text."""
+
+    with TemporaryDirectory() as d:
+        allocation = Path(d) / "allocation.csv"
+        summary = Path(d) / "summary.csv"
+        _write_allocation_csv(allocation, pick_log=result.pick_log)
+        _write_summary_csv(
+            summary,
+            seed=_FIXTURE_PARAMS["seed"],
+            cap_default=_FIXTURE_PARAMS["cap_default"],
+            b=_FIXTURE_PARAMS["b"],
+            draft_rounds=_FIXTURE_PARAMS["draft_rounds"],
+            post_iters=_FIXTURE_PARAMS["post_iters"],
+            summary=result.summary,
+        )
+        return allocation.read_text(encoding="utf-8"), summary.read_text(encoding="utf-8")
+
+
+def _run_once() -> tuple[list[tuple[object, ...]], RunSummary]:
+    """Run the fixture in memory and return the pick log as plain tuples plus the summary."""
+
+    result = _run_fixture()
+    picks = [
+        (
+            row.round_picked,
+            row.student_id,
+            row.course_id,
+            row.utility_at_pick,
+            row.base_at_pick,
+            row.friend_bonus_at_pick,
+        )
+        for row in result.pick_log
+    ]
+    return picks, result.summary
 
 
 class TestReproducibility(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        # The CSV-path tests only read the input tables, so they share one temporary copy.
+        tmp = TemporaryDirectory()
+        cls.addClassCleanup(tmp.cleanup)
+        cls.csv_a = Path(tmp.name) / "table1.csv"
+        cls.csv_b = Path(tmp.name) / "table2.csv"
+        _write_table_1(cls.csv_a)
+        _write_table_2(cls.csv_b)
+
     def test_same_seed_is_reproducible(self) -> None:
-        with TemporaryDirectory() as d1, TemporaryDirectory() as d2:
-            alloc1, summary1 = _run_once(Path(d1))
-            alloc2, summary2 = _run_once(Path(d2))
-        self.assertEqual(alloc1, alloc2)
+        picks1, summary1 = _run_once()
+        picks2, summary2 = _run_once()
+        self.assertEqual(picks1, picks2)
         self.assertEqual(summary1, summary2)
 
+    def test_seed_matches_golden_outputs(self) -> None:
+        allocation, summary = _render_outputs(_run_fixture())
+        self.assertEqual(allocation, GOLDEN_ALLOCATION.read_text(encoding="utf-8"))
+        self.assertEqual(summary, GOLDEN_SUMMARY.read_text(encoding="utf-8"))
+
+    def test_preloaded_rows_match_csv_run(self) -> None:
+        params = dict(cap_default=2, b=2, post_iters=1, improve_mode="swap", seed=7)
+        from_csv = run_hbs_social(self.csv_a, self.csv_b, **params)
+        from_rows = run_hbs_social_rows(_read_table_1(self.csv_a), _read_table_2(self.csv_b), **params)
+        self.assertEqual(from_csv.alloc, from_rows.alloc)
+        self.assertEqual(from_csv.summary, from_rows.summary)
+
+    def test_swap_top_k_is_reproducible(self) -> None:
+        params = dict(
+            cap_default=2,
+            b=1,
+            post_iters=2,
+            improve_mode="swap",
+            seed=7,
+            swap_top_k=1,
+            delta_check_every=1,
+        )
+        first = run_hbs_social(self.csv_a, self.csv_b, **params)
+        second = run_hbs_social(self.csv_a, self.csv_b, **params)
+        self.assertEqual(first.alloc, second.alloc)
+        self.assertEqual(first.post_log, second.post_log)
+        deltas = [delta for delta in first.post_log.delta_utilities if delta is not None]
+        self.assertTrue(all(delta > 0 for delta in deltas))
+
 
 if __name__ == "__main__":
     unittest.main()
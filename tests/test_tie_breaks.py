@@ -3,6 +3,7 @@ from __future__ import annotations
 import sys
 import unittest
 from pathlib import Path
+from typing import Sequence
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
@@ -11,61 +12,80 @@ from HBS.hbs_domain import IndividualPref, PairPref
 from HBS.hbs_engine import _HbsSocialDraftEngine
 
 
+# Every case runs with the same single-round config, so it is built once.
+_CONFIG = _RunConfig(
+    default_capacity=2,
+    max_courses=1,
+    draft_rounds=1,
+    post_iters=0,
+    total_iters=1,
+    improve_mode="swap",
+    progress=False,
+    seed=1,
+    sanity_checks=False,
+    delta_check_every=0,
+)
+
+
+# Frozen fixture rows, built once at import. The engine only reads its input tables.
+_SYM_PREFS = (IndividualPref(student_id="S1", course_id="C1", score=5, position=1),)
+_SYM_PAIR_PREFS = (
+    PairPref(student_id_a="S1", student_id_b="S2", course_id="C1", position=1, score=3),
+    PairPref(student_id_a="S1", student_id_b="S3", course_id="C1", position=2, score=3),
+    PairPref(student_id_a="S2", student_id_b="S1", course_id="C1", position=1, score=1),
+    PairPref(student_id_a="S3", student_id_b="S1", course_id="C1", position=1, score=5),
+)
+_TIEBREAK_PREFS = (
+    IndividualPref(student_id="S1", course_id="C1", score=5, position=1),
+    IndividualPref(student_id="S1", course_id="C2", score=5, position=2),
+)
+
+
 def _make_engine(
     *,
-    individual_prefs: list[IndividualPref],
-    pair_prefs: list[PairPref],
+    individual_prefs: Sequence[IndividualPref],
+    pair_prefs: Sequence[PairPref],
     student_lambdas: dict[str, float] | None = None,
 ) -> _HbsSocialDraftEngine:
-    config = _RunConfig(
-        default_capacity=2,
-        max_courses=1,
-        draft_rounds=1,
-        post_iters=0,
-        total_iters=1,
-        improve_mode="swap",
-        progress=False,
-        seed=1,
-        sanity_checks=False,
-        delta_check_every=0,
-    )
     return _HbsSocialDraftEngine(
         individual_prefs=individual_prefs,
         pair_prefs=pair_prefs,
         student_lambdas=student_lambdas,
-        config=config,
+        config=_CONFIG,
     )
 
 
+def _friend_utilities(
+    engine: _HbsSocialDraftEngine,
+    student_id: str,
+    friend_ids: tuple[str, ...],
+    course_id: str,
+) -> list[float]:
+    """Friend preference utilities rounded to 9 places, so a whole row compares in one assertion."""
+
+    return [
+        round(engine._friend_preference_utility(student_id, friend_id, course_id), 9)
+        for friend_id in friend_ids
+    ]
+
+
 class TestTieBreaks(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        # engine_sym is only read, so one instance serves the whole class.
+        cls.engine_sym = _make_engine(individual_prefs=_SYM_PREFS, pair_prefs=_SYM_PAIR_PREFS)
+
     def test_pref_ignores_position_when_score_present(self) -> None:
-        individual_prefs = [
-            IndividualPref(student_id="S1", course_id="C1", score=5, position=1)
-        ]
-        pair_prefs = [
-            PairPref(student_id_a="S1", student_id_b="S2", course_id="C1", position=1, score=3),
-            PairPref(student_id_a="S1", student_id_b="S3", course_id="C1", position=2, score=3),
-            PairPref(student_id_a="S2", student_id_b="S1", course_id="C1", position=1, score=1),
-            PairPref(student_id_a="S3", student_id_b="S1", course_id="C1", position=1, score=5),
-        ]
-        engine = _make_engine(individual_prefs=individual_prefs, pair_prefs=pair_prefs)
-
-        pref_1 = engine._friend_preference_utility("S1", "S2", "C1")
-        pref_2 = engine._friend_preference_utility("S1", "S3", "C1")
-        self.assertAlmostEqual(pref_1, pref_2, places=9)
-        self.assertAlmostEqual(pref_1, 0.5, places=9)
+        prefs = _friend_utilities(self.engine_sym, "S1", ("S2", "S3"), "C1")
+        self.assertEqual(prefs, [0.5, 0.5])
 
     def test_course_choice_ties_by_position(self) -> None:
-        individual_prefs = [
-            IndividualPref(student_id="S1", course_id="C1", score=5, position=1),
-            IndividualPref(student_id="S1", course_id="C2", score=5, position=2),
-        ]
+        # Running the draft mutates the engine, so this test builds its own.
         engine = _make_engine(
-            individual_prefs=individual_prefs,
-            pair_prefs=[],
+            individual_prefs=_TIEBREAK_PREFS,
+            pair_prefs=(),
             student_lambdas={"S1": 1.0},
         )
-
         pick_log = engine._run_initial_draft(1)
         self.assertEqual(len(pick_log), 1)
         self.assertEqual(pick_log[0].course_id, "C1")